@@ -0,0 +1,330 @@
+"""
+A computer opponent that plays over any networking.connection.Connection.
+
+The opponent places its fleet at random and then plays the same protocol as the Placement
+and Clash scenes: it sends READY, answers every STRIKE with a STRIKE_RESULT and sends its own
+STRIKEs when it is its turn. Its targets are chosen by DensityTargeting.
+Requires NumPy.
+
+Connect an opponent to a player hosting a game with: python ai.py --ip 127.0.0.1 --port 7777
+"""
+import argparse
+import random
+import time
+from threading import Thread, Event
+import numpy as np
+from board import Board, random_layout
+from networking.packet import Packet
+import networking.client
+import settings
+
+def _prefix_sums(a):
+    """
+    Get the running sums along the rows of an array, starting from 0.
+    The sum of the cells x..x + size - 1 of a row is then sums[y, x + size] - sums[y, x].
+
+    :param numpy.ndarray a: a two-dimensional array
+    :return: an array with one more column
+    :rtype: numpy.ndarray
+    """
+    sums = np.zeros((a.shape[0], a.shape[1] + 1), dtype=np.int64)
+    np.cumsum(a, axis=1, out=sums[:, 1:])
+    return sums
+
+class RandomTargeting():
+    """
+    Strikes every square once in a random order. A baseline to compare other targetings against.
+
+    :attr list self.targets: the grid positions (x, y) left to strike, the last one is struck first
+    """
+    def __init__(self, columns, rows, ship_sizes, seed=None):
+        """
+        The constructor.
+
+        :param int columns: how many squares there are horizontally
+        :param int rows: how many squares there are vertically
+        :param list ship_sizes: the size of every ship in the fleet, not used
+        :param seed: seed for the order of the strikes
+        """
+        self.targets = [(x, y) for y in range(rows) for x in range(columns)]
+        random.Random(seed).shuffle(self.targets)
+
+    def record(self, x, y, hit):
+        pass
+
+    def close(self):
+        pass
+
+    def next_target(self):
+        if len(self.targets) == 0:
+            return None
+        return self.targets.pop()
+
+class DensityTargeting():
+    """
+    Chooses strikes by counting for every square how many placements of the fleet could cover it.
+    A placement that crosses a miss is impossible, and a placement that covers hits is
+    weighted up so that a ship is finished once it has been found.
+
+    The rows and the columns of the board are kept as the lines of one array, so horizontal and
+    vertical placements of every ship size are counted at once with running sums over the lines.
+    A move takes linear time in the number of squares and a constant number of NumPy operations.
+
+    The protocol does not tell when a ship sinks, so every ship of the fleet is always counted.
+
+    :attr int self.columns: how many squares there are horizontally
+    :attr int self.rows: how many squares there are vertically
+    :attr dict self.fleet: how many ships there are of each size
+    :attr numpy.ndarray self.hits: 1 for the squares where a strike hit a ship, indexed [y, x]
+    :attr numpy.ndarray self.misses: 1 for the squares where a strike missed, indexed [y, x]
+    """
+    # How much more likely a placement is for each hit it covers
+    HIT_WEIGHT = 50
+
+    def __init__(self, columns, rows, ship_sizes, seed=None):
+        """
+        The constructor.
+
+        :param int columns: how many squares there are horizontally
+        :param int rows: how many squares there are vertically
+        :param list ship_sizes: the size of every ship in the fleet
+        :param seed: seed for choosing between equally good targets
+        """
+        self.columns = columns
+        self.rows = rows
+        self.fleet = {}
+        for size in ship_sizes:
+            self.fleet[size] = self.fleet.get(size, 0) + 1
+        # The rows of the board followed by its columns, padded with misses to the same length
+        length = max(columns, rows)
+        self._hit_lines = np.zeros((rows + columns, length), dtype=np.int64)
+        self._miss_lines = np.ones((rows + columns, length), dtype=np.int64)
+        self._miss_lines[:rows, :columns] = 0
+        self._miss_lines[rows:, :rows] = 0
+        self.hits = self._hit_lines[:rows, :columns]
+        self.misses = self._miss_lines[:rows, :columns]
+        # Index arrays of the placements, one row for each ship size and one column for each first square
+        sizes = np.array(list(self.fleet.keys()), dtype=np.int64)[:, None]
+        self._counts = np.array(list(self.fleet.values()), dtype=np.int64)[:, None]
+        self._first = np.arange(length)
+        self._last = np.minimum(self._first + sizes, length)
+        self._fits = self._first + sizes <= length
+        self._random = random.Random(seed)
+
+    def record(self, x, y, hit):
+        """
+        Record the result of a strike.
+
+        :param int x: the x-coordinate on the grid
+        :param int y: the y-coordinate on the grid
+        :param bool hit: did the strike hit a ship
+        """
+        lines = self._hit_lines if hit else self._miss_lines
+        lines[y, x] = 1
+        lines[self.rows + x, y] = 1
+
+    def struck(self):
+        return (self.hits | self.misses) != 0
+
+    def close(self):
+        """
+        Release the resources of the targeting. Nothing to release here.
+        """
+        pass
+
+    def density(self):
+        """
+        Count the weighted placements of the fleet that cover each square.
+        Squares that have been struck get 0.
+
+        :return: the counts indexed [y, x]
+        :rtype: numpy.ndarray
+        """
+        hit_sums = _prefix_sums(self._hit_lines)
+        miss_sums = _prefix_sums(self._miss_lines)
+        # Indexed [line, ship size, first square of the placement]
+        possible = (miss_sums[:, self._last] == miss_sums[:, None, self._first]) & self._fits
+        weights = possible * (self._counts * (1 + self.HIT_WEIGHT * (hit_sums[:, self._last] - hit_sums[:, None, self._first])))
+        # A square is covered by the placements that start at most size - 1 squares before it,
+        # the running sums are padded with zeros in front so that the window never starts before the line
+        length = self._first.shape[0]
+        pad = max(self.fleet)
+        weight_sums = np.zeros(weights.shape[:2] + (pad + length + 1,), dtype=np.int64)
+        np.cumsum(weights, axis=2, out=weight_sums[:, :, pad + 1:])
+        covered = weight_sums[:, :, pad + 1:].sum(axis=1)
+        for (i, size) in enumerate(self.fleet):
+            covered -= weight_sums[:, i, pad + 1 - size:pad + 1 - size + length]
+        density = covered[:self.rows, :self.columns] + covered[self.rows:, :self.rows].T
+        density[self.struck()] = 0
+        return density
+
+    def next_target(self):
+        """
+        Choose the square to strike next.
+
+        :return: the grid position (x, y), None if every square has been struck
+        :rtype: tuple or None
+        """
+        density = self.density()
+        unstruck = ~self.struck()
+        if not unstruck.any():
+            return None
+        # The fleet may not fit anywhere if the opponent broke the rules, any unstruck square will do then
+        if density.max() == 0:
+            best = np.flatnonzero(unstruck)
+        else:
+            best = np.flatnonzero(density == density.max())
+        index = int(best[self._random.randrange(len(best))])
+        return (index % self.columns, index // self.columns)
+
+def place_fleet(board, ship_sizes, rng):
+    """
+    Place ships on random free positions of a board.
+
+    :param board.Board board: the board to place the ships on
+    :param list ship_sizes: the size of every ship
+    :param random.Random rng: the random number generator
+    :return: True if every ship was placed, False if the fleet does not fit
+    :rtype: bool
+    """
+    layout = random_layout(board.columns, board.rows, ship_sizes, rng, board.ships)
+    if layout == None:
+        return False
+    for mask in layout:
+        board.place(mask)
+    return True
+
+class AIOpponent():
+    """
+    Plays a game against the other end of a connection on a thread of its own.
+
+    :attr networking.connection.Connection self.connection: an established connection to the opponent
+    :attr settings.Settings self.settings: the game settings
+    :attr bool self.host: does the opponent decide who goes first, like the hosting player does
+    :attr float self.move_delay: how many seconds to wait before each strike
+    :attr board.Board self.board: the opponent's own ships and the strikes against them
+    :attr DensityTargeting self.targeting: chooses the strikes, closed when the opponent stops playing
+    :attr bool self.won: True if the opponent won, False if it lost, None if the game has not ended
+    """
+    def __init__(self, connection, settings, host=False, seed=None, move_delay=0.0, targeting=None):
+        """
+        The constructor.
+
+        :param networking.connection.Connection connection: an established connection to the opponent
+        :param settings.Settings settings: the game settings
+        :param bool host: does the opponent decide who goes first
+        :param seed: seed for the placement and the strikes
+        :param float move_delay: how many seconds to wait before each strike
+        :param DensityTargeting targeting: chooses the strikes, a new DensityTargeting if not provided
+        """
+        self.connection = connection
+        self.settings = settings
+        self.host = host
+        self.move_delay = move_delay
+        self._random = random.Random(seed)
+        self.board = Board(settings.columns, settings.rows)
+        if not place_fleet(self.board, settings.ship_sizes(), self._random):
+            raise ValueError("The fleet does not fit on the board")
+        if targeting == None:
+            targeting = DensityTargeting(settings.columns, settings.rows, settings.ship_sizes(), self._random.random())
+        self.targeting = targeting
+        self.won = None
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start playing on a daemon thread.
+
+        :return: the thread
+        :rtype: threading.Thread
+        """
+        self._thread = Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """
+        Play until the connection closes or stop() is called.
+        """
+        try:
+            self._play()
+        finally:
+            self.targeting.close()
+
+    def _play(self):
+        self.connection.send_queue.put(Packet([], Packet.T_READY))
+        ready = False
+        while not self._stop.is_set():
+            if self.connection.check_closure() != None:
+                return
+            packet = self.connection.wait_packet(timeout=0.1)
+            if packet == None:
+                continue
+            if packet.type == Packet.T_READY and not ready:
+                ready = True
+                if self.host:
+                    # Decide who goes first like Clash does
+                    if self._random.randint(0, 1) == 0:
+                        self.strike()
+                    else:
+                        self.connection.send_queue.put(Packet([], Packet.T_YOUR_TURN))
+            elif packet.type == Packet.T_YOUR_TURN:
+                self.strike()
+            elif packet.type == Packet.T_STRIKE:
+                x, y = packet.get_data(include_header=False)
+                hit = self.board.strike(x, y)
+                self.connection.send_queue.put(Packet([int(hit), x, y], Packet.T_STRIKE_RESULT))
+                if self.board.fleet_destroyed():
+                    self.connection.send_queue.put(Packet([], Packet.T_GAME_OVER))
+                    self.won = False
+                else:
+                    self.strike()
+            elif packet.type == Packet.T_STRIKE_RESULT:
+                result, x, y = packet.get_data(include_header=False)
+                self.targeting.record(x, y, result == 1)
+            elif packet.type == Packet.T_GAME_OVER:
+                self.won = True
+
+    def strike(self):
+        """
+        Strike the square chosen by the targeting.
+        """
+        target = self.targeting.next_target()
+        if target == None:
+            return
+        if self.move_delay > 0:
+            self._stop.wait(self.move_delay)
+        self.connection.send_queue.put(Packet(list(target), Packet.T_STRIKE))
+
+def main():
+    parser = argparse.ArgumentParser(description="Play warships against a hosting player as the computer")
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds to wait before each strike")
+    parser.add_argument("--hard", action="store_true", help="choose the strikes with Monte Carlo sampling on every CPU")
+    parser.add_argument("--budget", type=float, default=0.25, help="seconds of sampling per strike with --hard")
+    args = parser.parse_args()
+    game_settings = settings.Settings()
+    targeting = None
+    if args.hard:
+        # Imported here because the module imports this one
+        from montecarlo import MonteCarloTargeting
+        targeting = MonteCarloTargeting(game_settings.columns, game_settings.rows, game_settings.ship_sizes(),
+                                        args.seed, args.budget)
+    connection = networking.client.Client()
+    connection.create(args.ip, args.port).start()
+    while not connection.connected:
+        if connection.check_closure() != None:
+            print("Could not connect")
+            return
+        time.sleep(0.1)
+    opponent = AIOpponent(connection, game_settings, seed=args.seed, move_delay=args.delay, targeting=targeting)
+    opponent.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import pygame
+from os import path
+from lrucache import LRUCache
+
+# The directory the images are loaded from
+DATA_DIR = 'data'
+
+# Images by (image name, size, rotation), shared by every component of the process
+_images = LRUCache(256)
+# Rendered texts by (font, font size, font style, text, colors, size)
+_texts = LRUCache(512)
+# Surfaces filled with a color by (size, color, alpha)
+_fills = LRUCache(64)
+
+def get_image(image_name, size=None, rotation=0):
+    """
+    Get an image that has been rotated and then scaled.
+    The image is loaded from the disk and transformed only the first time it is asked for,
+    after that the same surface is returned. The surface is shared, so copy it before changing it.
+
+    :param str image_name: the filename of the image with the file extension included
+    :param tuple size: the size (width, height) the image is scaled to, None to keep the original size
+    :param int rotation: the angle in degrees the image is rotated counterclockwise
+    :return: the image
+    :rtype: pygame.Surface
+    """
+    if size != None:
+        size = (int(size[0]), int(size[1]))
+    key = (image_name, size, rotation)
+    return _images.get_or_create(key, lambda: _create_image(image_name, size, rotation))
+
+def _create_image(image_name, size, rotation):
+    if size != None:
+        return pygame.transform.smoothscale(get_image(image_name, None, rotation), size)
+    if rotation != 0:
+        return pygame.transform.rotate(get_image(image_name), rotation)
+    return pygame.image.load(path.join(DATA_DIR, image_name)).convert_alpha()
+
+def render_text(font, text, fg_color=None, bg_color=None, size=None):
+    """
+    Render a text with a freetype font, or get it from the cache if it has been rendered before.
+    The surface is shared, so copy it before changing it.
+
+    :param pygame.freetype.Font font: the font
+    :param str text: the text
+    :param tuple fg_color: the color of the text, None for the default color of the font
+    :param tuple bg_color: the color of the background, None for a transparent background
+    :param tuple size: the size (width, height) the text is scaled to, None to keep the rendered size
+    :return: the surface and a new rectangle with the size and the offset of the text, like pygame.freetype.Font.render()
+    :rtype: tuple
+    """
+    if size != None:
+        size = (int(size[0]), int(size[1]))
+    # pygame.Color is not hashable
+    key = (font, font.size, font.style, text,
+           None if fg_color == None else tuple(fg_color),
+           None if bg_color == None else tuple(bg_color), size)
+    (surface, rect) = _texts.get_or_create(key, lambda: _create_text(font, text, fg_color, bg_color, size))
+    return (surface, rect.copy())
+
+def _create_text(font, text, fg_color, bg_color, size):
+    if size != None:
+        surface = render_text(font, text, fg_color, bg_color)[0]
+        return (pygame.transform.smoothscale(surface, size), pygame.Rect((0, 0), size))
+    return font.render(text, fg_color, bg_color)
+
+def get_fill(size, fill_color, alpha=None):
+    """
+    Get a surface filled with a color, such as a translucent overlay.
+    The surface is created only the first time it is asked for, so drawing it every frame allocates nothing.
+    The surface is shared, so do not draw on it.
+
+    :param tuple size: the size (width, height) of the surface
+    :param tuple fill_color: the color
+    :param int alpha: from 0 (invisible) to 255 (opaque), None for opaque
+    :rtype: pygame.Surface
+    """
+    key = (int(size[0]), int(size[1]), tuple(fill_color), alpha)
+    return _fills.get_or_create(key, lambda: _create_fill(key[:2], fill_color, alpha))
+
+def _create_fill(size, fill_color, alpha):
+    surface = pygame.Surface(size)
+    surface.fill(fill_color)
+    if alpha != None:
+        surface.set_alpha(alpha)
+    return surface
+
+def clear():
+    """
+    Forget every cached image, text and fill, for example after the display mode has changed.
+    """
+    _images.clear()
+    _texts.clear()
+    _fills.clear()
@@ -5,49 +5,78 @@ import grid
 import settings
 import scene
 import color
-from constants import TICK_RATE
-
-# Initialize the game engine
-pygame.init()
-
-# Set the window settings
-SCREEN_WIDTH = 1000
-SCREEN_HEIGHT = 700
-main_grid_offset_w = 50
-main_grid_offset_h = 50
-main_grid_width = SCREEN_WIDTH - 2 * main_grid_offset_w
-main_grid_height = SCREEN_HEIGHT - 2 * main_grid_offset_h
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT)) 
-pygame.display.set_caption("Warships")
-
-# Create global objects
-clock = pygame.time.Clock()
-settings = settings.Settings()
-reserved_squares = pygame.sprite.Group()
-main_grid = grid.Grid((main_grid_offset_w, main_grid_offset_h, main_grid_width, main_grid_height), settings.rows, settings.columns, 2, color.BLACK)
-square_group = main_grid.get_square_group(color.GREEN)
+from constants import IDLE_TIMEOUT
 
 class Game():
     def __init__(self):
         pass
 
     def main(self):
-        scene_handler = scene.SceneHandler(scene.Scene.MAIN_MENU, screen)
+        # Posted by the network threads when a connection receives something
+        wakeup_event = pygame.event.custom_type()
+        def wakeup():
+            # Posting is thread-safe, and a single pending wakeup is enough
+            if not pygame.event.peek(wakeup_event):
+                pygame.event.post(pygame.event.Event(wakeup_event))
+        scene_handler = scene.SceneHandler(scene.Scene.MAIN_MENU, screen, wakeup=wakeup)
 
         done = False
         while not done:
-            # Time between refreshing
-            clock.tick(TICK_RATE)
-            # Check events
-            if pygame.event.get(pygame.QUIT):
+            # Sleep until there is input, a connection wakes the loop up or the idle timeout passes
+            # A scene that still has to be drawn does not wait
+            if scene_handler.scene.dirty:
+                event = pygame.event.poll()
+            else:
+                event = pygame.event.wait(IDLE_TIMEOUT)
+            # The scenes never take QUIT events, so one that arrives later waits here for the next iteration
+            if event.type == pygame.QUIT or pygame.event.get(pygame.QUIT):
                 exit()
-            scene_handler.scene.check_events()
+            current = scene_handler.scene
+            if event.type != pygame.NOEVENT:
+                current.dirty = True
+                if event.type != wakeup_event:
+                    # Give the event back so that the scene sees it
+                    scene_handler.events.push(event)
+                pygame.event.clear(wakeup_event)
+            # Check events
+            current.check_events()
             # Do logic here
             scene_handler.scene.do_logic()
-            # Draw
-            scene_handler.scene.draw()
-            # This MUST happen after all the other drawing commands.
-            pygame.display.flip()
+            # Draw only when something may have changed
+            if scene_handler.scene is not current:
+                scene_handler.scene.dirty = True
+            if scene_handler.scene.dirty:
+                scene_handler.scene.dirty = False
+                changed = scene_handler.scene.draw()
+                # This MUST happen after all the other drawing commands.
+                if changed == None:
+                    pygame.display.flip()
+                elif len(changed) > 0:
+                    pygame.display.update(changed)
+            # Do not update the scene more often than it needs
+            clock.tick(scene_handler.scene.frame_rate)
+
+# Worker processes of the computer opponent import this module without running the game
+if __name__ == "__main__":
+    # Initialize the game engine
+    pygame.init()
+
+    # Set the window settings
+    SCREEN_WIDTH = 1000
+    SCREEN_HEIGHT = 700
+    main_grid_offset_w = 50
+    main_grid_offset_h = 50
+    main_grid_width = SCREEN_WIDTH - 2 * main_grid_offset_w
+    main_grid_height = SCREEN_HEIGHT - 2 * main_grid_offset_h
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT)) 
+    pygame.display.set_caption("Warships")
+
+    # Create global objects
+    clock = pygame.time.Clock()
+    settings = settings.Settings()
+    reserved_squares = pygame.sprite.Group()
+    main_grid = grid.Grid((main_grid_offset_w, main_grid_offset_h, main_grid_width, main_grid_height), settings.rows, settings.columns, 2, color.BLACK)
+    square_group = main_grid.get_square_group(color.GREEN)
 
-gg = Game()
-gg.main()
+    gg = Game()
+    gg.main()
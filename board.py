@@ -0,0 +1,317 @@
+import random
+
+# Placement masks by (columns, rows, ship size), shared by every board of the process
+_placement_masks = {}
+
+def placement_masks(columns, rows, size):
+    """
+    Get the mask of every position where a ship fits on a board of a size.
+    The masks are computed only the first time they are asked for.
+
+    :param int columns: how many squares there are horizontally
+    :param int rows: how many squares there are vertically
+    :param int size: how many squares the ship takes
+    :return: the masks, see Board.placement_masks()
+    :rtype: tuple
+    """
+    key = (columns, rows, size)
+    masks = _placement_masks.get(key)
+    if masks == None:
+        masks = tuple(Board(columns, rows).placement_masks(size))
+        _placement_masks[key] = masks
+    return masks
+
+def random_layout(columns, rows, ship_sizes, rng=None, occupied=0, attempts=100, restarts=1000):
+    """
+    Place a fleet at random positions where the ships do not overlap.
+
+    A position is first chosen for every ship independently and the whole layout is tried again
+    if any ships overlap, which makes every valid layout equally likely.
+    Fleets that fill most of the board rarely succeed that way, so after a number of attempts
+    the ships are placed one by one from the largest on the positions left free, starting over
+    if a ship does not fit anywhere. Those layouts are valid but not exactly uniformly distributed.
+
+    :param int columns: how many squares there are horizontally
+    :param int rows: how many squares there are vertically
+    :param list ship_sizes: the size of every ship
+    :param random.Random rng: the random number generator, the random module if not provided
+    :param int occupied: the mask of the squares that are already taken
+    :param int attempts: how many uniform attempts are made before placing the ships one by one
+    :param int restarts: how many times the ships are placed one by one at most
+    :return: the mask of every ship in the order of ship_sizes, None if no layout was found
+    :rtype: list or None
+    """
+    if rng == None:
+        rng = random
+    candidates = []
+    for size in ship_sizes:
+        masks = placement_masks(columns, rows, size)
+        if occupied != 0:
+            masks = [mask for mask in masks if mask & occupied == 0]
+        if len(masks) == 0:
+            return None
+        candidates.append(masks)
+    choice = rng.choice
+    for _ in range(attempts):
+        taken = occupied
+        layout = []
+        for masks in candidates:
+            mask = choice(masks)
+            if taken & mask:
+                break
+            taken |= mask
+            layout.append(mask)
+        else:
+            return layout
+    # The largest ships have the fewest free positions, so they are placed first
+    order = sorted(range(len(candidates)), key=lambda i: -ship_sizes[i])
+    for _ in range(restarts):
+        taken = occupied
+        layout = [0] * len(candidates)
+        for i in order:
+            mask = _choose_free(candidates[i], taken, rng)
+            if mask == None:
+                break
+            taken |= mask
+            layout[i] = mask
+        else:
+            return layout
+    return None
+
+def _choose_free(masks, taken, rng):
+    """
+    Choose a random mask that does not overlap the taken squares.
+    A few random picks usually find one, the free masks are listed only when they do not.
+    """
+    for _ in range(8):
+        mask = rng.choice(masks)
+        if mask & taken == 0:
+            return mask
+    free = [mask for mask in masks if mask & taken == 0]
+    if len(free) == 0:
+        return None
+    return rng.choice(free)
+
+class Board():
+    """
+    The state of one player's grid stored as integer bitmasks.
+    The square in grid position (x, y) is the bit number y * columns + x,
+    so checking a whole ship against the board is a single AND of two integers.
+    Sprites only draw the state, the rules are checked here.
+
+    :attr int self.columns: how many squares there are horizontally
+    :attr int self.rows: how many squares there are vertically
+    :attr int self.ships: the squares occupied by ships
+    :attr int self.strikes: the squares that have been struck
+    """
+    def __init__(self, columns, rows):
+        """
+        The constructor.
+
+        :param int columns: how many squares there are horizontally
+        :param int rows: how many squares there are vertically
+        """
+        self.columns = columns
+        self.rows = rows
+        self.ships = 0
+        self.strikes = 0
+
+    def bit(self, x, y):
+        """
+        Get the mask of a single square.
+
+        :param int x: the x-coordinate on the grid
+        :param int y: the y-coordinate on the grid
+        :return: the mask with only the square set
+        :rtype: int
+        """
+        return 1 << (y * self.columns + x)
+
+    def contains(self, x, y):
+        return 0 <= x < self.columns and 0 <= y < self.rows
+
+    def ship_mask(self, x, y, size, rotated=False):
+        """
+        Get the mask of a ship.
+
+        :param int x: the x-coordinate of the first square of the ship
+        :param int y: the y-coordinate of the first square of the ship
+        :param int size: how many squares the ship takes
+        :param bool rotated: does the ship extend downwards instead of to the right
+        :return: the mask of the squares the ship takes, None if the ship does not fit on the board
+        :rtype: int or None
+        """
+        if rotated:
+            if not (self.contains(x, y) and y + size <= self.rows):
+                return None
+            # Every square of a vertical ship is one row apart
+            mask = 0
+            for i in range(size):
+                mask |= self.bit(x, y + i)
+            return mask
+        if not (self.contains(x, y) and x + size <= self.columns):
+            return None
+        return ((1 << size) - 1) << (y * self.columns + x)
+
+    def placement_masks(self, size):
+        """
+        Get the mask of every position where a ship fits on the board.
+
+        :param int size: how many squares the ship takes
+        :return: the masks of the horizontal placements in row-major order followed by the vertical ones,
+                 a ship of one square has no separate vertical placements
+        :rtype: list
+        """
+        masks = []
+        for rotated in ((False,) if size == 1 else (False, True)):
+            for y in range(self.rows):
+                for x in range(self.columns):
+                    mask = self.ship_mask(x, y, size, rotated)
+                    if mask != None:
+                        masks.append(mask)
+        return masks
+
+    def positions_mask(self, positions):
+        """
+        Get the mask of any squares.
+
+        :param iterable positions: the grid positions (x, y) of the squares
+        :rtype: int
+        """
+        mask = 0
+        for (x, y) in positions:
+            mask |= self.bit(x, y)
+        return mask
+
+    def positions(self, mask):
+        """
+        Get the grid positions of the squares in a mask.
+
+        :param int mask: the mask of the squares
+        :return: the grid positions (x, y)
+        :rtype: list
+        """
+        positions = []
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            positions.append((index % self.columns, index // self.columns))
+            mask ^= low
+        return positions
+
+    def collides(self, mask):
+        """
+        See if any of the squares in a mask is taken by a ship.
+
+        :param int mask: the mask of the squares
+        :rtype: bool
+        """
+        return self.ships & mask != 0
+
+    def place(self, mask):
+        """
+        Place a ship on the board.
+
+        :param int mask: the mask of the squares the ship takes
+        :return: True if the ship was placed, False if it collides with another ship
+        :rtype: bool
+        """
+        if self.collides(mask):
+            return False
+        self.ships |= mask
+        return True
+
+    def occupied(self, x, y):
+        return self.ships & self.bit(x, y) != 0
+
+    def struck(self, x, y):
+        return self.strikes & self.bit(x, y) != 0
+
+    def strike(self, x, y):
+        """
+        Strike a square.
+
+        :param int x: the x-coordinate on the grid
+        :param int y: the y-coordinate on the grid
+        :return: True if the strike hit a ship, False if it missed
+        :rtype: bool
+        """
+        bit = self.bit(x, y)
+        self.strikes |= bit
+        return self.ships & bit != 0
+
+    @property
+    def hits(self):
+        return self.ships & self.strikes
+
+    @property
+    def misses(self):
+        return self.strikes & ~self.ships
+
+    def fleet_destroyed(self):
+        """
+        See if every square taken by a ship has been struck.
+
+        :rtype: bool
+        """
+        return self.ships != 0 and self.ships & ~self.strikes == 0
+
+class StrikeLedger():
+    """
+    The squares struck on a grid, one byte per square in row-major order.
+    Checking and adding a strike take constant time and finding the next unstruck square
+    is a single memchr-speed search, so the ledger stays fast on very large grids.
+
+    :attr int self.columns: how many squares there are horizontally
+    :attr int self.rows: how many squares there are vertically
+    :attr int self.count: how many squares have been struck
+    :attr bytearray self._cells: 1 for struck squares, 0 for the others
+    """
+    def __init__(self, columns, rows):
+        """
+        The constructor.
+
+        :param int columns: how many squares there are horizontally
+        :param int rows: how many squares there are vertically
+        """
+        self.columns = columns
+        self.rows = rows
+        self.count = 0
+        self._cells = bytearray(columns * rows)
+
+    def struck(self, x, y):
+        return self._cells[y * self.columns + x] != 0
+
+    def add(self, x, y):
+        """
+        Record a strike.
+
+        :param int x: the x-coordinate on the grid
+        :param int y: the y-coordinate on the grid
+        :return: True if the strike was recorded, False if the square had already been struck
+        :rtype: bool
+        """
+        index = y * self.columns + x
+        if self._cells[index]:
+            return False
+        self._cells[index] = 1
+        self.count += 1
+        return True
+
+    def next_unstruck(self, x, y):
+        """
+        Find the first unstruck square after a square in row-major order.
+        The search continues from the top left corner when the end of the grid is reached.
+
+        :param int x: the x-coordinate of the square to start after
+        :param int y: the y-coordinate of the square to start after
+        :return: the grid position (x, y) of the unstruck square, None if every square has been struck
+        :rtype: tuple or None
+        """
+        start = y * self.columns + x + 1
+        index = self._cells.find(0, start)
+        if index == -1:
+            index = self._cells.find(0, 0, start)
+            if index == -1:
+                return None
+        return (index % self.columns, index // self.columns)
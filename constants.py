@@ -1 +1,5 @@
 TICK_RATE = 100
+# How many milliseconds the main loop sleeps at most when nothing happens
+IDLE_TIMEOUT = 500
+# Use the asyncio based connections instead of the threaded ones
+ASYNC_NETWORKING = False
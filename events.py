@@ -0,0 +1,78 @@
+import pygame
+from collections import deque
+
+class EventSource():
+    """
+    Gives the scenes their input events.
+    The default source reads the pygame event queue.
+
+    :attr list self._pushed: events taken from the pygame event queue by someone else, to be handed out first
+    """
+    def __init__(self):
+        """
+        The constructor.
+        """
+        self._pushed = []
+
+    def push(self, event):
+        """
+        Give back an event that was taken from the pygame event queue, for example by pygame.event.wait().
+
+        :param pygame.event.Event event: the event
+        """
+        self._pushed.append(event)
+
+    def get(self):
+        """
+        Take every pending event except QUIT, which is left for the main loop.
+
+        :return: the events in the order they happened
+        :rtype: list
+        """
+        if len(self._pushed) == 0:
+            return pygame.event.get(exclude=pygame.QUIT)
+        events = self._pushed + pygame.event.get(exclude=pygame.QUIT)
+        self._pushed = []
+        return events
+
+class ScriptedEvents(EventSource):
+    """
+    An event source fed by code instead of a keyboard.
+    Used for running scenes without a display.
+
+    :attr collections.deque self._events: the events waiting to be taken
+    :parent: EventSource
+    """
+    def __init__(self):
+        """
+        The constructor.
+        """
+        self._events = deque()
+
+    def press(self, key, unicode=""):
+        """
+        Queue a key press.
+
+        :param int key: one of the pygame.K_ prefixed key constants
+        :param str unicode: the character typed by the key, if any
+        """
+        self._events.append(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode))
+
+    def post(self, event):
+        """
+        Queue any event.
+
+        :param pygame.event.Event event: the event
+        """
+        self._events.append(event)
+
+    def push(self, event):
+        self._events.append(event)
+
+    def get(self):
+        events = list(self._events)
+        self._events.clear()
+        return events
+
+    def empty(self):
+        return len(self._events) == 0
@@ -1,18 +1,122 @@
 import pygame
 
-class SquareSprite(pygame.sprite.Sprite):
-    def __init__(self, left, top, width, height, pos, color=None):
-        pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.Surface([width, height])
-        #self.image.fill(color)
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(left, top)
+class Square():
+    """
+    A square of a grid. Squares have no surface of their own, they only describe an area of the grid.
+
+    :attr tuple self.pos: the grid position (x, y) of the square
+    :attr pygame.Rect self.rect: the rectangle of the square in pixels
+    """
+    __slots__ = ("pos", "rect")
+
+    def __init__(self, left, top, width, height, pos):
+        """
+        The constructor.
+
+        :param int left: the x-coordinate of the left edge in pixels
+        :param int top: the y-coordinate of the top edge in pixels
+        :param int width: the width in pixels
+        :param int height: the height in pixels
+        :param tuple pos: the grid position (x, y) of the square
+        """
         self.pos = pos
-        self.width = width
-        self.height = height
+        self.rect = pygame.Rect(left, top, width, height)
+
+class SquareGroup():
+    """
+    The squares of a grid with an index from grid positions and pixels to squares.
+    Both kinds of lookups take constant time.
+    A square is created the first time it is looked up, so the group costs almost
+    nothing until it is used no matter how large the grid is.
+
+    :attr pygame.Rect self.grid_rect: the rectangle of the grid's boundaries
+    :attr tuple self.square_size: the size (width, height) of a square on the grid
+    :attr int self.columns: how many squares there are horizontally
+    :attr int self.rows: how many squares there are vertically
+    :attr dict self._squares: the created squares by row-major index
+    """
+    def __init__(self, grid_rect, square_size, columns, rows):
+        """
+        The constructor.
+
+        :param pygame.Rect grid_rect: the rectangle of the grid's boundaries
+        :param tuple square_size: the size (width, height) of a square on the grid
+        :param int columns: how many squares there are horizontally
+        :param int rows: how many squares there are vertically
+        """
+        self.grid_rect = grid_rect
+        self.square_size = square_size
+        self.columns = columns
+        self.rows = rows
+        self._squares = {}
+
+    def __len__(self):
+        return self.columns * self.rows
+
+    def __iter__(self):
+        for y in range(self.rows):
+            for x in range(self.columns):
+                yield self._get(x, y)
+
+    def _get(self, x, y):
+        index = y * self.columns + x
+        square = self._squares.get(index)
+        if square == None:
+            width, height = self.square_size
+            square = Square(self.grid_rect.x + x * width, self.grid_rect.y + y * height, width, height, (x, y))
+            self._squares[index] = square
+        return square
+
+    def square_at(self, pos):
+        """
+        Get the square in a grid position.
+
+        :param tuple pos: the grid position (x, y)
+        :return: the square, None if the position is outside the grid
+        :rtype: Square or None
+        """
+        x, y = pos
+        if 0 <= x < self.columns and 0 <= y < self.rows:
+            return self._get(x, y)
+        return None
+
+    def position_at(self, pixel):
+        """
+        Get the grid position of a pixel.
+
+        :param tuple pixel: the pixel coordinates (x, y)
+        :return: the grid position (x, y), None if the pixel is outside the grid
+        :rtype: tuple or None
+        """
+        x = (pixel[0] - self.grid_rect.x) // self.square_size[0]
+        y = (pixel[1] - self.grid_rect.y) // self.square_size[1]
+        if 0 <= x < self.columns and 0 <= y < self.rows:
+            return (x, y)
+        return None
+
+    def square_at_pixel(self, pixel):
+        pos = self.position_at(pixel)
+        if pos == None:
+            return None
+        return self.square_at(pos)
+
+    def squares_in_rect(self, rect):
+        """
+        Get the squares that a rectangle overlaps.
+
+        :param pygame.Rect rect: the rectangle in pixels
+        :return: the overlapped squares in row-major order
+        :rtype: list
+        """
+        clipped = rect.clip(self.grid_rect)
+        if clipped.width == 0 or clipped.height == 0:
+            return []
+        first = self.position_at(clipped.topleft)
+        last = self.position_at((clipped.right - 1, clipped.bottom - 1))
+        return [self._get(x, y) for y in range(first[1], last[1] + 1) for x in range(first[0], last[0] + 1)]
 
 class Grid: # Change init to use settings object as argument instead
-    def __init__(self, rect, rows, columns, thickness, color = (0, 0, 0)):
+    def __init__(self, rect, rows, columns, thickness, color = (0, 0, 0), alpha = None, background = None):
         # It is possible to pass the rect argument as instance of pygame.Rect
         # or as coordinates (top, left, width, height)
         if isinstance(rect, pygame.Rect):
@@ -33,61 +137,83 @@ class Grid: # Change init to use settings object as argument instead
         self._rows = rows
         self._thickness = thickness
         self._color = color
+        self._alpha = alpha
+        self._background = background
+        # The lines are drawn once into this surface
+        self._cache = None
+        self._cache_key_drawn = None
 
     def get_rect(self):
         return self._rect
 
-    def get_reserved_squares(self, squares, ships):
-        reserved_squares = pygame.sprite.Group()
-        for square in squares:
-            if pygame.sprite.spritecollideany(square, ships) is not None:
-                reserved_squares.add(square)
-        return reserved_squares       
-
-    def get_square_group(self, color):
-        square_size = self.get_square_size_abs()
-        rows = self._rows
-        columns = self._columns
-        group = pygame.sprite.Group()
-        for x in range(0, rows):
-            for y in range(0, columns):
-                x1 = self._rect.x + (x * square_size[0])
-                y1 = self._rect.y + (y * square_size[1])
-                square = SquareSprite(x1, y1, square_size[0], square_size[1], (x, y), color)
-                group.add(square)
-        return group
+    def get_square_group(self, color=None):
+        # The squares are created when they are first looked up
+        return SquareGroup(self._rect, self.get_square_size_abs(), self._columns, self._rows)
 
     def get_square(self, pos):
         # Get square in grid position
         square_size = self.get_square_size_abs()
-        square = pygame.sprite.Sprite()
         x1 = self._rect.x + (pos[0] * square_size[0])
         y1 = self._rect.y + (pos[1] * square_size[1])
-        return SquareSprite(x1, y1, square_size[0], square_size[1], (pos[0], pos[1]))
-
-    def draw_with_alpha(self, colorkey, alpha):
-        # NOT UP TO DATE
-        grid_surface = pygame.Surface((self._rect.width, self._rect.height))
-        grid_surface.set_colorkey(colorkey)
-        grid_surface.set_alpha(alpha)
-        for i in range(0, self._line_count_y):
-            y = i * self._square_size_y
-            pygame.draw.line(grid_surface, self._color, [0, y], [self._rect.width, y], self._thickness)
-            
-        for i in range(0, self._line_count_x):
-            x = i * self._square_size_x
-            pygame.draw.line(grid_surface, self._color, [x, 0], [x, self._rect.height], self._thickness)
-        pygame.Surface.blit(self._screen, grid_surface, (0, 0))
-    
-    def draw(self, surface):
+        return Square(x1, y1, square_size[0], square_size[1], (pos[0], pos[1]))
+
+    def set_alpha(self, alpha):
+        """
+        Set the transparency of the grid.
+
+        :param int alpha: from 0 (invisible) to 255 (opaque), None for opaque
+        """
+        self._alpha = alpha
+
+    def set_background(self, background):
+        """
+        Set the color drawn under the lines.
+
+        :param tuple background: the color, None for a transparent background
+        """
+        self._background = background
+
+    def _cache_key(self):
+        return (tuple(self._rect), self._thickness, tuple(self._color), self._columns, self._rows,
+                self._alpha, None if self._background == None else tuple(self._background))
+
+    def _build_surface(self):
+        # Lines on the edges are centered on the edges, so they extend outside the rectangle
+        pad = self._thickness
+        surface = pygame.Surface((self._rect.width + 2 * pad, self._rect.height + 2 * pad))
+        # Everything but the lines and the background is transparent
+        # A colorkeyed surface is run-length encoded, which blits much faster than per-pixel alpha
+        used = (tuple(self._color), None if self._background == None else tuple(self._background))
+        colorkey = next(key for key in ((255, 0, 255), (0, 255, 0), (0, 0, 255)) if key not in used)
+        surface.fill(colorkey)
+        surface.set_colorkey(colorkey, pygame.RLEACCEL)
+        if self._background != None:
+            surface.fill(self._background, pygame.Rect(pad, pad, self._rect.width, self._rect.height))
         for i in range(0, self._columns + 1):
-            x = self._rect.x + (i * self._square_size_x) 
-            pygame.draw.line(surface, self._color, [x, self._rect.y], [x, self._rect.bottom], self._thickness)
+            x = pad + (i * self._square_size_x)
+            pygame.draw.line(surface, self._color, [x, pad], [x, pad + self._rect.height], self._thickness)
 
         for i in range(0, self._rows + 1):
-            y = self._rect.y + (i * self._square_size_y)
-            pygame.draw.line(surface, self._color, [self._rect.x, y], [self._rect.right, y], self._thickness)
-         
+            y = pad + (i * self._square_size_y)
+            pygame.draw.line(surface, self._color, [pad, y], [pad + self._rect.width, y], self._thickness)
+        if self._alpha != None:
+            surface.set_alpha(self._alpha, pygame.RLEACCEL)
+        return surface
+
+    def draw(self, surface):
+        """
+        Draw the grid with a single blit.
+        The lines are drawn once into a cached surface that is rebuilt
+        only when the rectangle, thickness, color, dimensions, alpha or background change.
+
+        :param pygame.Surface surface: the surface to draw on
+        """
+        key = self._cache_key()
+        if key != self._cache_key_drawn:
+            self._cache = self._build_surface()
+            self._cache_key_drawn = key
+        surface.blit(self._cache, (self._rect.x - self._thickness, self._rect.y - self._thickness))
+
     def get_square_size_abs(self):
         return (self._square_size_x, self._square_size_y)
     
@@ -1,5 +1,5 @@
 import pygame
-from os import path
+import assets
 
 class TransformError(Exception):
     pass
@@ -10,8 +10,8 @@ class GridComponent(pygame.sprite.Sprite):
 
     :attr tuple self.square_size: the size (width, height) of a square on the grid
     :attr pygame.Rect self.grid_rect: the rectangle of the grid's boundaries
-    :attr pygame.sprite.Group() self.square_group: the squares of the grid
-    :attr pygame.sprite.Group() self._squares: the squares that the component occupies
+    :attr grid.SquareGroup self.square_group: the squares of the grid
+    :attr list self._squares: the squares that the component occupies
     :attr pygame.Rect self.rect: the rectangle of the component
     :attr str image_name: the filename of the image with the file extension included
     :attr pygame.Surface self.image: the image surface of the component
@@ -23,7 +23,7 @@ class GridComponent(pygame.sprite.Sprite):
 
         :param tuple square_size: the size (width, height) of a square on the grid
         :param pygame.Rect grid_rect: the rectangle of the grid's boundaries
-        :param pygame.sprite.Group() square_group: the squares of the grid
+        :param grid.SquareGroup square_group: the squares of the grid
         :param str image_name: the filename of the image with the file extension included
         """
         pygame.sprite.Sprite.__init__(self)
@@ -32,25 +32,26 @@ class GridComponent(pygame.sprite.Sprite):
         self.grid_rect = grid_rect
         self.square_group = square_group
 
-        self._squares = pygame.sprite.Group()
+        self._squares = []
         self.rect = None
         self.image_name = image_name
         self.image = self.load_image(image_name)
         self.scale_image(self.square_size)
 
-        start_pos = self.square_group.sprites()[0].rect.topleft
+        start_pos = self.square_group.square_at((0, 0)).rect.topleft
         self.move_to(start_pos[0], start_pos[1])
 
     def load_image(self, image_name):
         """
         Load an image to the self.image surface.
         Updates the self.image_name and self.rect attributes aswell.
+        The image comes from the shared asset cache, so it must not be changed in place.
 
         :param str image_name: the filename of the image with the file extension included
         :return: the loaded image
         :rtype: pygame.Surface
         """
-        self.image = pygame.image.load(path.join('data', image_name)).convert_alpha() 
+        self.image = assets.get_image(image_name)
         self.image_name = image_name
         self.rect = self.image.get_rect()
 
@@ -69,7 +70,7 @@ class GridComponent(pygame.sprite.Sprite):
         # Scale
         width = size[0]
         height = size[1]
-        self.image = pygame.transform.smoothscale(self.image, (width, height))
+        self.image = assets.get_image(self.image_name, (width, height))
 
         # Update the rectangle
         current_x = self.rect.x
@@ -93,8 +94,8 @@ class GridComponent(pygame.sprite.Sprite):
         """
         Get the squares that the component occupies currently.
 
-        :return: A group of the squares
-        :rtype: pygame.sprite.Group()
+        :return: the squares in row-major order
+        :rtype: list
         """
         return self._squares
 
@@ -106,38 +107,29 @@ class GridComponent(pygame.sprite.Sprite):
         :return: None-object
         :rtype: None
         """
-        # Remove the old squares
-        self._squares.empty()
-        
-        # Add the new squares
-        square_list = pygame.sprite.spritecollide(self, self.square_group, False)
-        self._squares.add(square_list)
+        self._squares = self.square_group.squares_in_rect(self.rect)
 
     def transform(self, square_size, new_squares):
         """
         Transform the current position of the component to a position on a new grid.
 
         :param tuple square_size: the size (width, height) of a square on the new grid
-        :param pygame.sprite.Group new_squares: squares of the new grid
+        :param grid.SquareGroup new_squares: squares of the new grid
         :return: None-object
         :rtype: None
         """
         # Update square group
         self.square_group = new_squares
         # Get the position of the ship's first square
-        ship_pos = self.get_squares().sprites()[0].pos
+        ship_pos = self.get_squares()[0].pos
         # Scale the ship's image to fit the new squares
         self.scale_image(square_size)
-        # Loop through the new squares and try to find the corresponding square
-        square_found = False
-        for square in new_squares:
-            if square.pos == ship_pos:
-                square_found = True
-                self.move_to(square.rect.x, square.rect.y) # Move the component to the corresponding position
-                break
-        if square_found == False:
+        # Find the corresponding square
+        square = new_squares.square_at(ship_pos)
+        if square == None:
             message = "Corresponding square in new_squares was not found."
             raise TransformError(message)
+        self.move_to(square.rect.x, square.rect.y) # Move the component to the corresponding position
 
     def move_to(self, x, y):
         """
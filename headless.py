@@ -0,0 +1,206 @@
+"""
+Runs games between scripted players without a display.
+
+Each player has its own SceneHandler that is fed key presses by a ScriptedPlayer instead of a
+keyboard, and the players are connected with a real Server and Client on the loopback interface,
+or with a LoopbackConnection inside the process. Nothing is drawn and the loop only waits when both
+players are waiting for packets, so games are played as fast as the CPU allows. Used for load and
+soak testing.
+
+Run from the game directory with: python headless.py --games 10
+"""
+import os
+# The dummy drivers must be chosen before pygame opens the display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import argparse
+import random
+import time
+from threading import Event
+import pygame
+import scene
+from events import ScriptedEvents
+from networking.localpair import connect_pair
+from networking.loopback import loopback_pair
+
+class ScriptedPlayer():
+    """
+    Plays a game by pressing keys based on the state of the current scene.
+    One key is pressed per tick.
+
+    :attr scene.SceneHandler self.scene_handler: the scenes of the player
+    :attr events.ScriptedEvents self.events: the event source the key presses are fed to
+    :attr list self.positions: the grid positions (x, y) where ships are tried to be placed in order
+    :attr list self.targets: the grid positions (x, y) left to strike, the last one is struck first
+    :attr bool self.auto_place: are the ships placed with a single key press instead of moving them one by one
+    """
+    def __init__(self, screen, settings, connection, seed=None, auto_place=False):
+        """
+        The constructor.
+
+        :param pygame.Surface screen: the surface the scenes are created for
+        :param settings.Settings settings: the game settings
+        :param networking.connection.Connection connection: an established connection to the opponent
+        :param int seed: seed for the order of the strikes
+        :param bool auto_place: place the ships with a single key press instead of moving them one by one
+        """
+        self.events = ScriptedEvents()
+        self.scene_handler = scene.SceneHandler(scene.Scene.PLACEMENT, screen, settings, connection, events=self.events)
+        self.scene_handler.headless = True
+        self.auto_place = auto_place
+        # Ship positions (x, y) in the order they are tried
+        self.positions = [(x, y) for y in range(settings.rows) for x in range(settings.columns)]
+        self._candidate = 0
+        self._last = None
+        self.targets = [(x, y) for x in range(settings.columns) for y in range(settings.rows)]
+        random.Random(seed).shuffle(self.targets)
+
+    def finished(self):
+        return isinstance(self.scene_handler.scene, (scene.End, scene.ConnectionClosedMenu))
+
+    def tick(self):
+        """
+        Press the next key and run the logic of the current scene once.
+
+        :return: True if a key was pressed or the scene changed, False if the player is waiting for the opponent
+        :rtype: bool
+        """
+        current = self.scene_handler.scene
+        key = None
+        if isinstance(current, scene.Placement):
+            key = self.placement_key(current)
+        elif isinstance(current, scene.Clash):
+            key = self.clash_key(current)
+        if key != None:
+            self.events.press(key)
+        current.check_events()
+        # The scene may have changed in check_events
+        self.scene_handler.scene.do_logic()
+        return key != None or self.scene_handler.scene is not current
+
+    def placement_key(self, placement):
+        """
+        Move the awaiting ship through the grid row by row and place it on the first free position.
+        """
+        if placement.ready:
+            return None
+        if self.auto_place:
+            return pygame.K_a
+        grid_rect = placement.grid.get_rect()
+        ship_rect = placement.awaiting_ship.rect
+        position = ((ship_rect.x - grid_rect.x) // placement.square_size[0],
+                    (ship_rect.y - grid_rect.y) // placement.square_size[1])
+        target = self.positions[self._candidate]
+        if position == target:
+            self._last = None
+            if placement.collides:
+                self._candidate += 1
+                return self.placement_key(placement)
+            return pygame.K_RETURN
+        if position[1] < target[1]:
+            key = pygame.K_DOWN
+        elif position[1] > target[1]:
+            key = pygame.K_UP
+        elif position[0] < target[0]:
+            key = pygame.K_RIGHT
+        else:
+            key = pygame.K_LEFT
+        if self._last == (position, key):
+            # The ship did not move, so it does not fit in the target position
+            self._last = None
+            self._candidate += 1
+            return self.placement_key(placement)
+        self._last = (position, key)
+        return key
+
+    def clash_key(self, clash):
+        """
+        Move the crosshair to the next target and strike it.
+        """
+        if not clash.your_turn or len(self.targets) == 0:
+            return None
+        target = self.targets[-1]
+        position = clash.crosshair.get_squares()[0].pos
+        if position[0] < target[0]:
+            return pygame.K_RIGHT
+        if position[0] > target[0]:
+            return pygame.K_LEFT
+        if position[1] < target[1]:
+            return pygame.K_DOWN
+        if position[1] > target[1]:
+            return pygame.K_UP
+        self.targets.pop()
+        return pygame.K_RETURN
+
+def play(screen, settings, use_async=False, seed=None, timeout=60.0, auto_place=False, loopback=False):
+    """
+    Play one game between two scripted players over a loopback connection.
+
+    :param pygame.Surface screen: the surface the scenes are created for
+    :param settings.Settings settings: the game settings
+    :param bool use_async: use the asyncio connections instead of the threaded ones
+    :param int seed: seed for the strike orders of the players
+    :param float timeout: how many seconds the game may take at most
+    :param bool auto_place: place the ships with a single key press instead of moving them one by one
+    :param bool loopback: connect the players inside the process instead of over the loopback interface
+    :return: how many ticks the game took, None if it did not finish in time
+    :rtype: int or None
+    """
+    if loopback:
+        server, client = loopback_pair()
+    else:
+        server, client = connect_pair(use_async)
+    rng = random.Random(seed)
+    players = [
+        ScriptedPlayer(screen, settings, server, rng.random(), auto_place),
+        ScriptedPlayer(screen, settings, client, rng.random(), auto_place),
+    ]
+    # Set by the connections when a packet arrives
+    wake = Event()
+    server.wakeup = wake.set
+    client.wakeup = wake.set
+    ticks = 0
+    deadline = time.monotonic() + timeout
+    try:
+        while not all(player.finished() for player in players):
+            if time.monotonic() > deadline:
+                return None
+            # Packets that arrive after this are noticed by the wait below
+            wake.clear()
+            pressed = False
+            for player in players:
+                if not player.finished():
+                    pressed = player.tick() or pressed
+            if not pressed:
+                # Both players wait for packets, sleep until one arrives
+                wake.wait(0.1)
+            ticks += 1
+    finally:
+        client.close()
+    return ticks
+
+def main():
+    parser = argparse.ArgumentParser(description="Play warships games between scripted players without a display")
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument("--async", dest="use_async", action="store_true", help="use the asyncio connections")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--auto-place", action="store_true", help="place the ships at random with a single key press")
+    parser.add_argument("--loopback", action="store_true", help="connect the players inside the process without sockets")
+    args = parser.parse_args()
+    pygame.init()
+    screen = pygame.display.set_mode((scene.SCREEN_WIDTH, scene.SCREEN_HEIGHT))
+    rng = random.Random(args.seed)
+    start = time.monotonic()
+    finished = 0
+    for i in range(args.games):
+        ticks = play(screen, scene.settings, args.use_async, rng.random(), auto_place=args.auto_place, loopback=args.loopback)
+        if ticks == None:
+            print(f"Game {i + 1} did not finish")
+        else:
+            finished += 1
+            print(f"Game {i + 1} finished in {ticks} ticks")
+    elapsed = time.monotonic() - start
+    print(f"{finished}/{args.games} games finished in {elapsed:.2f} s ({finished / elapsed:.2f} games/s)")
+
+if __name__ == "__main__":
+    main()
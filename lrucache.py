@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+class LRUCache():
+    """
+    A mapping with a bounded size that evicts the least recently used entry when it is full.
+
+    :attr int self.maxsize: how many entries are kept at most
+    :attr int self.hits: how many lookups found their entry
+    :attr int self.misses: how many lookups did not find their entry
+    :attr collections.OrderedDict self._entries: the entries from the least to the most recently used
+    """
+    def __init__(self, maxsize=128):
+        """
+        The constructor.
+
+        :param int maxsize: how many entries are kept at most
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Get the value of a key and mark it as the most recently used.
+
+        :param key: the key
+        :param default: returned if the key is not in the cache
+        :return: the value of the key or the default
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Set the value of a key, evicting the least recently used entry if the cache is full.
+
+        :param key: the key
+        :param value: the value
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_or_create(self, key, create):
+        """
+        Get the value of a key, creating and caching it if it is not in the cache.
+
+        :param key: the key
+        :param function create: called without arguments to create the value
+        :return: the value of the key
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = create()
+            self.put(key, value)
+            return value
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
@@ -1,6 +1,7 @@
 import pygame
 import pygame.freetype
 import color
+import assets
 from constants import TICK_RATE
 
 pygame.freetype.init()
@@ -23,22 +24,25 @@ class Label():
         self.scale_rect = scale_rect
         # Keeps the label centered on the same spot even if the text is changed
         self.keep_center = True
-        properties = self._font.render(self.text, self.fg_color, self.bg_color)
+        if scale_rect == None:
+            properties = assets.render_text(self._font, self.text, self.fg_color, self.bg_color)
+        else:
+            properties = assets.render_text(self._font, self.text, self.fg_color, self.bg_color, scale_rect.size)
         self.surf = properties[0]
         self.rect = properties[1]
         if scale_rect != None:
-            # Scale the surface
-            self.surf = pygame.transform.smoothscale(self.surf, (scale_rect.w, scale_rect.h))
             self.rect = scale_rect
         
     def update(self):
         # Returns a tuple: the new surface and the rectangle
-        properties = self._font.render(self.text, self.fg_color, self.bg_color)
+        # Texts that have been shown before come from the cache without rendering any glyphs
+        if self.scale_rect == None:
+            properties = assets.render_text(self._font, self.text, self.fg_color, self.bg_color)
+        else:
+            properties = assets.render_text(self._font, self.text, self.fg_color, self.bg_color, self.scale_rect.size)
         new_surf = properties[0]
         new_rect = properties[1]
         if self.scale_rect != None:
-            # Scale the surface
-            new_surf = pygame.transform.smoothscale(new_surf, (self.scale_rect.w, self.scale_rect.h))
             new_rect = self.scale_rect
         if self.keep_center:
             new_rect.center = self.rect.center
@@ -90,23 +94,27 @@ class TextBox():
         for i in range(0, self._size):
             blank += "X"
         # Create a background surface and a rectangle
-        (self._fg_surf, fg_rect) = font.render(blank, self._bg_color, self._bg_color) 
+        fg_rect = assets.render_text(font, blank, self._bg_color, self._bg_color)[1]
+        # The area of the text inside the border
+        self._text_area = pygame.Rect((0, 0), fg_rect.size)
         bg_rect = fg_rect.copy()
         bg_rect.inflate_ip(self._bor_w, self._bor_w)
         self.rect = bg_rect
         self._bg_surf = pygame.Surface(bg_rect.size)
         self._bg_surf.fill(self._bor_color)
+        self._bg_surf.fill(self._bg_color, self._text_area.move(self._bor_w / 2, self._bor_w / 2))
         # Render the text surface on the background surface
-        self._surf = self.update_surf()
+        self._surf = self._bg_surf.copy()
+        self.update_surf()
         # Clear textbox when user input is detected for the first time
         self._clear_text = True
 
     def update_surf(self):
-        fg_surf = self._fg_surf.copy()
-        new_surf = self._bg_surf.copy()
-        self._font.render_to(fg_surf, (0,0), self._text, self._fg_color, self._bg_color)
-        new_surf.blit(fg_surf, (self._bor_w / 2, self._bor_w / 2))
-        return new_surf
+        # Redraw the same surface instead of creating a new one on every key press
+        self._surf.blit(self._bg_surf, (0, 0))
+        text_surf = assets.render_text(self._font, self._text, self._fg_color, self._bg_color)[0]
+        self._surf.blit(text_surf, (self._bor_w / 2, self._bor_w / 2), self._text_area)
+        return self._surf
 
     def enter(self, key, char):
         update = True
@@ -166,7 +174,7 @@ class Button():
         else:
             self._bg_color = bg_color
         # Create a surface and a rectangle
-        (self._surf, self.rect) = font.render(text, fg_color, bg_color)
+        (self._surf, self.rect) = assets.render_text(font, text, fg_color, bg_color)
 
     def get_rect(self):
         return self.rect
@@ -207,8 +215,16 @@ class Menu():
             self.sel_rect = self.sel_obj.get_rect().copy()
             self.sel_rect.inflate_ip(self._sel_inflation, self._sel_inflation)
 
-    def check_menu_events(self):
-        for event in pygame.event.get():
+    def check_menu_events(self, events=None):
+        """
+        Handle the input events of the menu.
+
+        :param list events: the events to handle, the pygame event queue is read if not provided
+        :return: the chosen button, -1 if the menu was cancelled, None if nothing was chosen
+        """
+        if events == None:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 exit()
             elif event.type == pygame.KEYDOWN:
@@ -237,9 +253,8 @@ class Menu():
         if self.rect == None:
             self.screen.fill(self.bg_color)
         else:
-            new_surf = pygame.Surface(self.rect.size)
-            new_surf.fill(self.bg_color)
-            self.screen.blit(new_surf, self.rect)
+            # Filling the area directly needs no surface of its own
+            self.screen.fill(self.bg_color, self.rect)
         for label in self.labels:
             label.draw(self.screen)
         for sel in self.selectables:
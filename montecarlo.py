@@ -0,0 +1,161 @@
+"""
+Monte Carlo targeting for the computer opponent.
+
+Whole fleet layouts are sampled at random and the ones that agree with every hit and miss
+seen so far are kept. How often each square is covered by the kept layouts estimates how likely
+a ship is there, and the most likely square is struck next.
+The sampling is spread over worker processes and every move gets a fixed time budget.
+Requires NumPy.
+"""
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ai import DensityTargeting
+from board import placement_masks
+
+def sample_layouts(columns, rows, ship_sizes, hits, misses, budget, seed):
+    """
+    Sample fleet layouts that agree with the strikes until the time budget runs out.
+    A layout is drawn by choosing a position for every ship independently and it is kept only if
+    no ships overlap, no ship is on a miss and every hit is on a ship, so the kept layouts are
+    uniformly distributed over the layouts that agree with the strikes.
+
+    :param int columns: how many squares there are horizontally
+    :param int rows: how many squares there are vertically
+    :param list ship_sizes: the size of every ship in the fleet
+    :param int hits: the mask of the squares where a strike hit a ship, like board.Board.ships
+    :param int misses: the mask of the squares where a strike missed
+    :param float budget: how many seconds to sample
+    :param seed: seed for the sampling
+    :return: how many layouts were kept and how many of them cover each square, indexed [y, x]
+    :rtype: tuple
+    """
+    rng = random.Random(seed)
+    candidates = []
+    for size in ship_sizes:
+        masks = [mask for mask in placement_masks(columns, rows, size) if mask & misses == 0]
+        if len(masks) == 0:
+            return (0, np.zeros((rows, columns), dtype=np.int64))
+        candidates.append(masks)
+    choice = rng.choice
+    layouts = []
+    end = time.perf_counter() + budget
+    while time.perf_counter() < end:
+        # The clock is read only once per batch
+        for _ in range(200):
+            layout = 0
+            for masks in candidates:
+                mask = choice(masks)
+                if layout & mask:
+                    break
+                layout |= mask
+            else:
+                if layout & hits == hits:
+                    layouts.append(layout)
+    return (len(layouts), _coverage(layouts, columns, rows))
+
+def _coverage(layouts, columns, rows):
+    """
+    Count how many of the layouts cover each square.
+    """
+    if len(layouts) == 0:
+        return np.zeros((rows, columns), dtype=np.int64)
+    width = (columns * rows + 7) // 8
+    data = b"".join(layout.to_bytes(width, "little") for layout in layouts)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(len(layouts), width), axis=1, bitorder="little")
+    return bits[:, :columns * rows].sum(axis=0, dtype=np.int64).reshape(rows, columns)
+
+def _warm_up():
+    return os.getpid()
+
+class MonteCarloTargeting(DensityTargeting):
+    """
+    Chooses strikes from the layouts sampled by worker processes.
+    The targeting falls back to counting placements like DensityTargeting when too few layouts
+    agree with the strikes to be sampled in time.
+    next_target() blocks for the time budget, so call it from a thread other than the pygame main thread,
+    as the computer opponent does.
+
+    :attr float self.budget: how many seconds each move may take
+    :attr int self.workers: how many processes sample the layouts
+    :attr int self.min_samples: how many layouts have to be kept for the estimate to be used
+    :attr int self.samples: how many layouts were kept on the latest move
+    :attr list self.ship_sizes: the size of every ship in the fleet
+    :attr numpy.ndarray self.heatmap: how many of the layouts kept on the latest move cover each square, None before the first move
+    :parent: DensityTargeting
+    """
+    def __init__(self, columns, rows, ship_sizes, seed=None, budget=0.25, workers=None, min_samples=100):
+        """
+        The constructor.
+        The worker processes are started here, so that the first move does not have to wait for them.
+
+        :param int columns: how many squares there are horizontally
+        :param int rows: how many squares there are vertically
+        :param list ship_sizes: the size of every ship in the fleet
+        :param seed: seed for the sampling and for choosing between equally good targets
+        :param float budget: how many seconds each move may take
+        :param int workers: how many processes sample the layouts, the number of CPUs if not provided
+        :param int min_samples: how many layouts have to be kept for the estimate to be used
+        """
+        DensityTargeting.__init__(self, columns, rows, ship_sizes, seed)
+        self.ship_sizes = list(ship_sizes)
+        self.budget = budget
+        self.workers = workers or os.cpu_count() or 1
+        self.min_samples = min_samples
+        self.samples = 0
+        self.heatmap = None
+        # The workers are started fresh instead of forked from a process that runs pygame and network threads
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        for future in [self._executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _mask(self, cells):
+        mask = 0
+        for index in np.flatnonzero(cells):
+            mask |= 1 << int(index)
+        return mask
+
+    def sample(self):
+        """
+        Sample layouts on every worker for the time budget.
+
+        :return: how many layouts were kept and how many of them cover each square, indexed [y, x]
+        :rtype: tuple
+        """
+        hits = self._mask(self.hits)
+        misses = self._mask(self.misses)
+        futures = [self._executor.submit(sample_layouts, self.columns, self.rows, self.ship_sizes,
+                                         hits, misses, self.budget, self._random.random())
+                   for _ in range(self.workers)]
+        samples = 0
+        heatmap = np.zeros((self.rows, self.columns), dtype=np.int64)
+        for future in futures:
+            (count, coverage) = future.result()
+            samples += count
+            heatmap += coverage
+        return (samples, heatmap)
+
+    def next_target(self):
+        """
+        Choose the square most often covered by the sampled layouts.
+
+        :return: the grid position (x, y), None if every square has been struck
+        :rtype: tuple or None
+        """
+        (self.samples, heatmap) = self.sample()
+        heatmap[self.struck()] = 0
+        self.heatmap = heatmap
+        if self.samples < self.min_samples or heatmap.max() == 0:
+            return DensityTargeting.next_target(self)
+        best = np.flatnonzero(heatmap == heatmap.max())
+        index = int(best[self._random.randrange(len(best))])
+        return (index % self.columns, index // self.columns)
@@ -0,0 +1,336 @@
+import asyncio
+import struct
+from queue import Queue
+from threading import Thread
+from networking.connection import Connection
+from networking.packet import Packet
+from networking.framer import StreamFramer, FramingError
+from networking.stats import ConnectionStats
+from networking.heartbeat import Heartbeat
+
+class PacketProtocol(asyncio.BufferedProtocol):
+    """
+    An asyncio protocol that frames received bytes into packets.
+    Bytes are received directly into the buffer of a StreamFramer.
+
+    :attr function self.on_packet: called with every received Packet
+    :attr function self.on_lost: called with the exception (or None) when the connection is lost
+    :attr asyncio.Transport self.transport: the transport of the connection
+    :attr bool self.closing: has the transport been closed by us
+    :attr int self.version: the packet codec version agreed with the other end, None before the handshake
+    :attr networking.stats.ConnectionStats self.stats: traffic counters of the connection
+    :attr networking.heartbeat.Heartbeat self.heartbeat: liveness checks and round-trip times, None if disabled
+    :attr function self.on_negotiated: called with the agreed codec version after the handshake, or None
+    """
+    # How many seconds a closure waits for the handshake so that the packets sent before it reach the other end
+    HANDSHAKE_TIMEOUT = 2.0
+
+    def __init__(self, on_packet, on_lost, stats=None, heartbeat=None, on_negotiated=None):
+        """
+        The constructor.
+        Ping packets are always answered but they are sent only if a heartbeat is provided.
+
+        :param function on_packet: called with every received Packet
+        :param function on_lost: called with the exception (or None) when the connection is lost
+        :param networking.stats.ConnectionStats stats: the counters to update, new counters are created if not provided
+        :param networking.heartbeat.Heartbeat heartbeat: sends the pings, None to not send pings
+        :param function on_negotiated: called with the agreed codec version after the handshake
+        """
+        if stats == None:
+            stats = ConnectionStats()
+        self.stats = stats
+        self.heartbeat = heartbeat
+        self._ping_timer = None
+        self._close_timer = None
+        self.on_packet = on_packet
+        self.on_lost = on_lost
+        self.on_negotiated = on_negotiated
+        self.transport = None
+        self.closing = False
+        self.version = None
+        self._framer = StreamFramer()
+        # Packets sent before the handshake has been completed
+        self._unsent = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+        hello = Packet.hello().pack_data()
+        self.stats.packet_out(Packet.T_HELLO, len(hello))
+        self.stats.send_calls += 1
+        transport.write(hello)
+
+    def get_buffer(self, sizehint):
+        return self._framer.writable()
+
+    def buffer_updated(self, nbytes):
+        self._framer.commit(nbytes)
+        self.stats.recv_calls += 1
+        try:
+            for frame in self._framer.frames():
+                # A closure started before the handshake still waits for the first packet
+                if self.closing and self.version != None:
+                    return
+                packet = Packet(frame, version=self._framer.version)
+                self.stats.packet_in(packet.type, len(frame))
+                if self.version == None:
+                    # The first packet completes the handshake
+                    self.version = Packet.negotiate(packet)
+                    self._framer.version = self.version
+                    self._write(self._unsent)
+                    self._unsent = None
+                    if self.closing:
+                        self._close_timer.cancel()
+                        self.transport.close()
+                        return
+                    if self.on_negotiated != None:
+                        self.on_negotiated(self.version)
+                    if self.heartbeat != None and Heartbeat.supported(self.version):
+                        self._schedule_ping()
+                    if packet.type == Packet.T_HELLO:
+                        continue
+                if packet.type == Packet.T_PING:
+                    self.send(Heartbeat.pong(packet))
+                elif packet.type == Packet.T_PONG:
+                    if self.heartbeat != None:
+                        self.heartbeat.received_pong(packet)
+                else:
+                    self.on_packet(packet)
+        except (FramingError, struct.error, ValueError) as e:
+            self.stats.decode_errors += 1
+            print("Received a malformed packet:", e)
+            self.transport.abort()
+
+    def eof_received(self):
+        # Returning a false value closes the transport
+        return False
+
+    def connection_lost(self, exc):
+        if self._ping_timer != None:
+            self._ping_timer.cancel()
+        if self._close_timer != None:
+            self._close_timer.cancel()
+        self.on_lost(exc)
+
+    def _schedule_ping(self):
+        loop = asyncio.get_running_loop()
+        self._ping_timer = loop.call_later(self.heartbeat.interval, self._ping)
+
+    def _ping(self):
+        if self.closing:
+            return
+        if self.heartbeat.stalled():
+            print("The other end stopped answering heartbeats.")
+            # The connection is lost as if the other end had dropped it
+            self.transport.abort()
+            return
+        self.send(self.heartbeat.ping())
+        self._schedule_ping()
+
+    def send(self, packet):
+        """
+        Write a packet to the transport.
+
+        :param Packet packet: the packet to be sent
+        """
+        self.send_all([packet])
+
+    def send_all(self, packets):
+        """
+        Write packets to the transport with a single write.
+        Packets sent before the handshake has been completed are written after it.
+
+        :param list packets: the packets to be sent in order
+        """
+        if self.closing:
+            return
+        if self.version == None:
+            self._unsent.extend(packets)
+        else:
+            self._write(packets)
+
+    def _write(self, packets):
+        if len(packets) == 0:
+            return
+        data = []
+        for packet in packets:
+            packed = packet.pack_data(self.version)
+            self.stats.packet_out(packet.type, len(packed))
+            data.append(packed)
+        self.transport.writelines(data)
+        self.stats.send_calls += 1
+
+    def close(self):
+        """
+        Close the transport after the buffered data has been sent.
+        Packets sent before the handshake can only be packed once the codec version is known,
+        so then the transport is closed after the handshake or after HANDSHAKE_TIMEOUT seconds.
+        """
+        self.closing = True
+        if self.version == None and len(self._unsent) > 0:
+            loop = asyncio.get_running_loop()
+            self._close_timer = loop.call_later(self.HANDSHAKE_TIMEOUT, self.transport.close)
+        else:
+            self.transport.close()
+
+class SendQueue(Queue):
+    """
+    A queue that wakes up an event loop when a packet is put in it.
+    Wakeups are coalesced so that a burst of puts schedules only one flush.
+    """
+    def __init__(self):
+        Queue.__init__(self)
+        self._loop = None
+        self._flush = None
+        self._flush_scheduled = False
+
+    def attach(self, loop, flush):
+        """
+        Start waking up the event loop.
+
+        :param asyncio.AbstractEventLoop loop: the event loop to wake up
+        :param function flush: called in the event loop to drain the queue
+        """
+        self._loop = loop
+        self._flush = flush
+        self._schedule()
+
+    def put(self, item, block=True, timeout=None):
+        Queue.put(self, item, block, timeout)
+        if self._loop != None and not self._flush_scheduled:
+            self._schedule()
+
+    def _schedule(self):
+        self._flush_scheduled = True
+        try:
+            self._loop.call_soon_threadsafe(self._run_flush)
+        except RuntimeError:
+            # The event loop has already been closed
+            pass
+
+    def _run_flush(self):
+        self._flush_scheduled = False
+        self._flush()
+
+class AsyncConnection(Connection):
+    """
+    A connection that runs sending and receiving on a single asyncio event loop thread.
+    It keeps the send_queue/get_packet/check_closure contract of Connection
+    but does not poll: the loop sleeps until data arrives or a packet is queued.
+    Derived classes have to implement self._start() like with Connection.
+
+    :attr asyncio.AbstractEventLoop self._loop: the event loop of the connection
+    :attr PacketProtocol self._protocol: the protocol of the established connection, None until the transport has been created
+    :attr bool self._close_pending: was the connection closed before the transport had been created
+    :parent: networking.connection.Connection
+    """
+    def __init__(self, nodelay=True, heartbeat_interval=1.0, heartbeat_misses=5):
+        """
+        The constructor.
+
+        :param bool nodelay: send small packets immediately instead of waiting to combine them (TCP_NODELAY)
+        :param float heartbeat_interval: seconds between ping packets, None to disable heartbeats
+        :param int heartbeat_misses: how many unanswered pings close the connection as an uncontrolled closure
+        """
+        Connection.__init__(self, nodelay, heartbeat_interval, heartbeat_misses)
+        self.send_queue = SendQueue()
+        self._loop = None
+        self._protocol = None
+        self._close_pending = False
+        self._closed = None
+
+    def start_send_recv(self, socket):
+        """
+        Start the event loop thread that sends and receives on the socket.
+        Set connected status to True.
+
+        :param socket.socket socket: The socket on which the send and receive operations will be processed
+        """
+        if self.socket == None:
+            raise NotImplementedError("You must override self.socket")
+        self._loop = asyncio.new_event_loop()
+        loop_thread = Thread(target=self._run_loop, args=[socket])
+        loop_thread.daemon = True
+        loop_thread.start()
+        self.connected = True
+        self._wake()
+
+    def _run_loop(self, socket):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve(socket))
+        finally:
+            self._loop.close()
+        print("Closing event loop thread.")
+
+    async def _serve(self, socket):
+        socket.setblocking(False)
+        self._closed = self._loop.create_future()
+        _, self._protocol = await self._loop.connect_accepted_socket(
+                lambda: PacketProtocol(self._on_packet, self._on_lost, self.stats, self.heartbeat, self._set_version),
+                sock=socket)
+        # asyncio always enables TCP_NODELAY so the option is applied afterwards
+        self.configure_socket(socket)
+        if self._close_pending:
+            # close() was called while the transport was being created
+            self._protocol.send(Packet([0], Packet.T_CLOSE))
+            self._protocol.close()
+        else:
+            self.send_queue.attach(self._loop, self._flush_send_queue)
+        await self._closed
+
+    def close(self):
+        """
+        Start closure procedure and inform the other end of the connection.
+        """
+        if self._loop == None:
+            # The connection has not been established yet
+            Connection.close(self)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._close, True)
+        except RuntimeError:
+            # The event loop has already been closed
+            pass
+
+    def _close(self, initiator):
+        if self._protocol == None:
+            # There is no transport to send the closure on yet, _serve() sends it once there is
+            if not self._close_pending:
+                self._close_pending = True
+                self.connected = False
+                self._closure_queue.put(True)
+                self._wake()
+            return
+        if self._protocol.closing:
+            return
+        if initiator:
+            self._flush_send_queue()
+            self._protocol.send(Packet([0], Packet.T_CLOSE))
+        self._protocol.close()
+        self.connected = False
+        self._closure_queue.put(True)
+        self._wake()
+
+    def _flush_send_queue(self):
+        packets = []
+        while not self.send_queue.empty():
+            packet = self.send_queue.get(block=False)
+            # None is put in the queue only to wake up the sender
+            if packet != None:
+                packets.append(packet)
+        self._protocol.send_all(packets)
+
+    def _on_packet(self, packet):
+        if packet.type == Packet.T_CLOSE:
+            self._close(False)
+        else:
+            self.recv_queue.put(packet)
+            self._wake()
+
+    def _on_lost(self, exc):
+        if not self._protocol.closing:
+            print("Connection was lost:", exc)
+            self._protocol.closing = True
+            self._uncontrolled_closure()
+        if not self._closed.done():
+            self._closed.set_result(None)
@@ -0,0 +1,214 @@
+"""
+Benchmarks of the networking stack over the loopback interface.
+
+Measures the packet codec, one-way packet throughput between a Server and a Client
+with several payload sizes and burst patterns, and ping-pong round-trip times.
+The results are written as JSON so that runs before and after a change can be compared.
+
+Run with: python -m networking.benchmark --output results.json
+"""
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import time
+from threading import Condition, Thread
+from networking.packet import Packet
+from networking.localpair import connect_pair, close_pair
+from networking.stats import LatencyHistogram
+
+# Payload sizes in items of a ship positions packet
+PAYLOAD_SIZES = [2, 16, 128, 1024]
+# How many packets may be in flight before the sender waits for the receiver, None for no limit
+BURSTS = [1, 16, 256, None]
+
+def bench_codec(payload_sizes=PAYLOAD_SIZES, duration=0.2):
+    """
+    Measure how fast packets are packed and unpacked with each codec version.
+
+    :param list payload_sizes: the payload sizes in items
+    :param float duration: how many seconds to run each measurement at least
+    :return: a result for each version and payload size
+    :rtype: list
+    """
+    def measure(function):
+        calls = 0
+        batch = 100
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        while True:
+            for _ in range(batch):
+                function()
+            calls += batch
+            elapsed = time.perf_counter() - wall
+            if elapsed >= duration:
+                return (calls / elapsed, (time.process_time() - cpu) / calls)
+
+    results = []
+    for version in (Packet.V1, Packet.V2):
+        for size in payload_sizes:
+            packet = Packet([i % 100 for i in range(size)], Packet.T_SHIP_POSITIONS)
+            data = packet.pack_data(version)
+            pack_rate, pack_cpu = measure(lambda: packet.pack_data(version))
+            unpack_rate, unpack_cpu = measure(lambda: Packet(data, version=version))
+            results.append({
+                "version": version,
+                "payload_items": size,
+                "wire_bytes": len(data),
+                "pack_ops_per_sec": pack_rate,
+                "pack_cpu_us": pack_cpu * 1e6,
+                "unpack_ops_per_sec": unpack_rate,
+                "unpack_cpu_us": unpack_cpu * 1e6,
+            })
+    return results
+
+def bench_throughput(server, client, payload_items, burst, count):
+    """
+    Send packets one way from the client to the server as fast as possible.
+    CPU time covers both ends since they run in the same process.
+
+    :param Server server: the receiving end
+    :param Client client: the sending end
+    :param int payload_items: the payload size in items
+    :param int burst: how many packets may be in flight before the sender waits, None for no limit
+    :param int count: how many packets to send
+    :return: the result of the measurement, packets tells how many were delivered if the receiver stopped early
+    :rtype: dict
+    """
+    condition = Condition()
+    received = [0]
+    stopped = [False]
+    received_bytes = server.stats.bytes_in.get(Packet.T_SHIP_POSITIONS, 0)
+
+    def receive():
+        while received[0] < count:
+            if server.wait_packet(Packet.T_SHIP_POSITIONS, timeout=10.0) == None:
+                # Timed out or the connection closed, wake up the sender so that it does not wait forever
+                with condition:
+                    stopped[0] = True
+                    condition.notify()
+                return
+            with condition:
+                received[0] += 1
+                condition.notify()
+
+    receiver = Thread(target=receive, daemon=True)
+    receiver.start()
+    data = [i % 100 for i in range(payload_items)]
+    window = count if burst == None else burst
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    sent = 0
+    while sent < count:
+        with condition:
+            room = condition.wait_for(lambda: sent - received[0] < window or stopped[0], 10.0)
+        if not room or stopped[0]:
+            # Report what was delivered instead of waiting for packets that will not arrive
+            break
+        for _ in range(min(window - (sent - received[0]), count - sent)):
+            client.send_queue.put(Packet(data, Packet.T_SHIP_POSITIONS))
+            sent += 1
+    receiver.join()
+    elapsed = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return {
+        "payload_items": payload_items,
+        "burst": burst,
+        "packets": received[0],
+        "packets_sent": sent,
+        "packets_per_sec": received[0] / elapsed,
+        "bytes_per_sec": (server.stats.bytes_in.get(Packet.T_SHIP_POSITIONS, 0) - received_bytes) / elapsed,
+        "cpu_us_per_packet": cpu / max(1, received[0]) * 1e6,
+    }
+
+def bench_rtt(server, client, count):
+    """
+    Measure round-trip times by answering every strike with a strike result.
+
+    :param Server server: the answering end
+    :param Client client: the end that measures
+    :param int count: how many round trips to make
+    :return: the percentiles and jitter of the round-trip times in microseconds
+    :rtype: dict
+    """
+    def answer():
+        for _ in range(count):
+            strike = server.wait_packet(Packet.T_STRIKE, timeout=10.0)
+            if strike == None:
+                return
+            server.send_queue.put(Packet([0] + list(strike.get_data(include_header=False)), Packet.T_STRIKE_RESULT))
+
+    answerer = Thread(target=answer, daemon=True)
+    answerer.start()
+    histogram = LatencyHistogram(window=count)
+    cpu = time.process_time()
+    for i in range(count):
+        start = time.perf_counter()
+        client.send_queue.put(Packet([i % 10, i % 7], Packet.T_STRIKE))
+        if client.wait_packet(Packet.T_STRIKE_RESULT, timeout=10.0) == None:
+            break
+        histogram.record(time.perf_counter() - start)
+    cpu = time.process_time() - cpu
+    answerer.join()
+    summary = histogram.summary()
+    result = {"round_trips": summary.pop("count")}
+    for name, value in summary.items():
+        result[name + "_us"] = None if value == None else value * 1e6
+    result["cpu_us_per_round_trip"] = cpu / max(1, result["round_trips"]) * 1e6
+    return result
+
+def run(use_async=False, nodelay=True, count=20000, round_trips=2000, duration=0.2):
+    """
+    Run every benchmark.
+
+    :param bool use_async: use the asyncio connections instead of the threaded ones
+    :param bool nodelay: disable Nagle's algorithm on both ends
+    :param int count: how many packets to send in each throughput measurement
+    :param int round_trips: how many round trips to measure
+    :param float duration: how many seconds to run each codec measurement at least
+    :return: the results
+    :rtype: dict
+    """
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "transport": "async" if use_async else "threaded",
+        "nodelay": nodelay,
+        "codec": bench_codec(duration=duration),
+        "throughput": [],
+    }
+    server, client = connect_pair(use_async, nodelay)
+    results["version"] = client.version
+    try:
+        for size in PAYLOAD_SIZES:
+            for burst in BURSTS:
+                # Lock-step sending is slow, so fewer packets are enough
+                packets = count // 10 if burst == 1 else count
+                results["throughput"].append(bench_throughput(server, client, size, burst, packets))
+        results["rtt"] = bench_rtt(server, client, round_trips)
+    finally:
+        close_pair(server, client)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Warships networking benchmarks")
+    parser.add_argument("--output", help="file to write the JSON results to, standard output if not given")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="benchmark the asyncio connections")
+    parser.add_argument("--nagle", action="store_true", help="leave Nagle's algorithm enabled")
+    parser.add_argument("--count", type=int, default=20000, help="packets per throughput measurement")
+    parser.add_argument("--round-trips", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=0.2, help="seconds per codec measurement")
+    args = parser.parse_args()
+    # The connections print their progress, keep it out of the results
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(args.use_async, not args.nagle, args.count, args.round_trips, args.duration)
+    text = json.dumps(results, indent=2)
+    if args.output == None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
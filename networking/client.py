@@ -1,10 +1,11 @@
 import socket
 from threading import Thread
 from networking.connection import Connection
+from networking.aioconnection import AsyncConnection
 
 class Client(Connection):
-    def __init__(self):
-        Connection.__init__(self)
+    def __init__(self, nodelay=True, heartbeat_interval=1.0, heartbeat_misses=5):
+        Connection.__init__(self, nodelay, heartbeat_interval, heartbeat_misses)
 
     def _start(self, ip, port):
         interrupt = False
@@ -28,6 +29,14 @@ class Client(Connection):
                 pass
             except ConnectionRefusedError:
                 self._closure_queue.put(False)
+                self._wake()
                 return
             
         self.start_send_recv(self.socket)
+
+class AsyncClient(AsyncConnection, Client):
+    """
+    A client that sends and receives on an asyncio event loop instead of threads.
+    """
+    def __init__(self, nodelay=True, heartbeat_interval=1.0, heartbeat_misses=5):
+        AsyncConnection.__init__(self, nodelay, heartbeat_interval, heartbeat_misses)
@@ -1,33 +1,103 @@
+import logging
+import struct
+import socket as sock
 from socket import timeout
-from threading import Thread
-from queue import Queue
-from time import sleep
+from threading import Thread, Event
+from queue import Queue, Empty
+from time import sleep, monotonic
 from networking.packet import Packet
+from networking.framer import StreamFramer, FramingError
+from networking.inbox import PacketInbox
+from networking.stats import ConnectionStats
+from networking.heartbeat import Heartbeat
 
-BUFFER_SIZE = 2048
+log = logging.getLogger(__name__)
+
+# Most systems limit the number of buffers in a single sendmsg call to 1024
+MAX_IOV = 1024
+
+def send_buffers(receiver, buffers):
+    """
+    Send all the buffers with as few system calls as possible.
+    The buffers are written with a single sendmsg call when the system allows it
+    and partial writes are continued from where they stopped.
+
+    :param socket.socket receiver: the socket to send on
+    :param list buffers: the bytes-like objects to send in order
+    :return: how many send calls were made
+    :rtype: int
+    :raises OSError: if sending fails
+    """
+    if not hasattr(receiver, "sendmsg"):
+        # sendmsg is not available on Windows
+        receiver.sendall(b"".join(buffers))
+        return 1
+    views = [memoryview(buffer) for buffer in buffers]
+    i = 0
+    calls = 0
+    while i < len(views):
+        calls += 1
+        try:
+            sent = receiver.sendmsg(views[i:i + MAX_IOV])
+        except timeout:
+            # The socket buffer is full, try again
+            continue
+        # Skip the buffers that were sent completely
+        while sent > 0:
+            length = len(views[i])
+            if sent >= length:
+                sent -= length
+                i += 1
+            else:
+                views[i] = views[i][sent:]
+                sent = 0
+    return calls
 
 class Connection():
     """
     Derived classes have to implement self._start() and override self.socket with a local endpoint.
 
     :attr bool self.connected: is the connection established
+    :attr bool self.is_host: does this end decide who goes first
+    :attr bool self.nodelay: is Nagle's algorithm disabled on the connection (TCP_NODELAY)
+    :attr int self.version: the packet codec version agreed with the other end, None before the handshake
+    :attr networking.stats.ConnectionStats self.stats: traffic counters of the connection
+    :attr networking.heartbeat.Heartbeat self.heartbeat: liveness checks and round-trip times, None if disabled
+    :attr function self.wakeup: called from the connection's threads when a packet arrives or the state changes, or None
     :attr socket.socket self.socket: local socket endpoint
-    :attr queue.Queue self.recv_queue: queue for packets to be sent
-    :attr queue.Queue self.send_queue: queue for received packets
+    :attr networking.inbox.PacketInbox self.recv_queue: received packets by type
+    :attr queue.Queue self.send_queue: queue for packets to be sent
     :attr queue.Queue self._interrupt_queue: queue for interrupting the connection
     :attr queue.Queue self._closure_queue: queue used when closing the connection
     """
-    def __init__(self):
+    is_host = False
+    # How many seconds a closing connection waits for the other end to answer the close packet
+    CLOSE_TIMEOUT = 2.0
+
+    def __init__(self, nodelay=True, heartbeat_interval=1.0, heartbeat_misses=5):
         """
         The constructor. 
+
+        :param bool nodelay: send small packets immediately instead of waiting to combine them (TCP_NODELAY)
+        :param float heartbeat_interval: seconds between ping packets, None to disable heartbeats
+        :param int heartbeat_misses: how many unanswered pings close the connection as an uncontrolled closure
         """
         self.connected = False
+        self.nodelay = nodelay
         self.socket = None
-        self.recv_queue = Queue()
+        self.recv_queue = PacketInbox()
         self.send_queue = Queue()
         self._interrupt_queue = Queue()
         self._closure_queue = Queue()
-        self._incomplete_packet = None
+        self.version = None
+        self.wakeup = None
+        self._negotiated = Event()
+        self._recv_thread = None
+        self.stats = ConnectionStats(self._queue_depths)
+        if heartbeat_interval == None:
+            self.heartbeat = None
+        else:
+            self.heartbeat = Heartbeat(self.stats, heartbeat_interval, heartbeat_misses)
     
     def create(self, ip, port):
         """
@@ -62,11 +132,29 @@ class Connection():
         """
         if self.socket == None:
             raise NotImplementedError("You must override self.socket")
+        self.configure_socket(socket)
         recv_thread = Thread(target=self._receive, args=[socket])
         recv_thread.start()
+        self._recv_thread = recv_thread
         send_thread = Thread(target=self._send, args=[socket])
         send_thread.start()
         self.connected = True
+        self._wake()
+
+    def _wake(self):
+        if self.wakeup != None:
+            self.wakeup()
+
+    def _queue_depths(self):
+        return {"send_queue_depth": self.send_queue.qsize(), "recv_queue_depth": self.recv_queue.qsize()}
+
+    def configure_socket(self, socket):
+        """
+        Apply the options of the connection to a connected socket.
+
+        :param socket.socket socket: the connected socket
+        """
+        socket.setsockopt(sock.IPPROTO_TCP, sock.TCP_NODELAY, int(self.nodelay))
 
     def check_closure(self):
         """
@@ -88,123 +176,229 @@ class Connection():
         Start closure procedure and inform the other end of the connection.
         The underlying socket and the threads will be closed when receiving and sending are halted.
         """
-        self._interrupt_queue.put(True)
+        self._interrupt(True)
+
+    def wait_negotiated(self, timeout=None):
+        """
+        Wait until the packet codec version has been agreed with the other end.
+
+        :param float timeout: how many seconds to wait at most, None to wait until it happens
+        :return: True if the version has been agreed, False if the wait timed out or the connection was closed first
+        :rtype: bool
+        """
+        self._negotiated.wait(timeout)
+        return self.version != None
+
+    def _interrupt(self, controlled):
+        self._interrupt_queue.put(controlled)
+        # Wake up the send-thread
+        self._negotiated.set()
+        self.send_queue.put(None)
+
+    def _set_version(self, version):
+        self.version = version
+        self._negotiated.set()
+        # Wake up the send-thread so that it starts the heartbeat
+        self.send_queue.put(None)
+
+    def _heartbeat_enabled(self):
+        return self.heartbeat != None and Heartbeat.supported(self.version)
 
     def _controlled_closure(self, receiver, initiator):
         if initiator:
             try:
                 data = [0]
                 close_packet = Packet(data, Packet.T_CLOSE)
-                receiver.send(close_packet.pack_data())
+                receiver.sendall(close_packet.pack_data(self.version or Packet.V1))
             except:
                 print("Error in controlled closure: failed to send close packet.")
         self.connected = False
         self._closure_queue.put(True)
+        self._wake()
 
     def _uncontrolled_closure(self):
         self.connected = False
         self._closure_queue.put(False)
+        self._wake()
 
     def _send(self, receiver):
+        # Start the handshake by telling the other end which codec versions are supported
+        hello = Packet.hello().pack_data()
+        self.stats.packet_out(Packet.T_HELLO, len(hello))
+        try:
+            self.stats.send_calls += send_buffers(receiver, [hello])
+        except OSError:
+            print("Error in sending data. Closing send-thread.")
+            self._uncontrolled_closure()
+            return
+
+        next_ping = None
         while True:
+            # Sleep until there is something to send, the connection is interrupted or a ping is due
+            timeout = None
+            if self._heartbeat_enabled():
+                if next_ping == None:
+                    next_ping = monotonic() + self.heartbeat.interval
+                timeout = max(0, next_ping - monotonic())
+            try:
+                packets = [self.send_queue.get(timeout=timeout)]
+            except Empty:
+                packets = []
+            # Take everything that has been queued so that it can be sent at once
+            try:
+                while True:
+                    packets.append(self.send_queue.get(block=False))
+            except Empty:
+                pass
+
+            # Packets are encoded only after the codec version has been agreed
+            self._negotiated.wait()
+            version = self.version or Packet.V1
+            if next_ping != None and monotonic() >= next_ping:
+                if self.heartbeat.stalled():
+                    print("The other end stopped answering heartbeats. Closing send-thread.")
+                    self._uncontrolled_closure()
+                    # Make the recv-thread stop aswell
+                    try:
+                        receiver.shutdown(sock.SHUT_RDWR)
+                    except OSError:
+                        pass
+                    return
+                packets.append(self.heartbeat.ping())
+                next_ping = monotonic() + self.heartbeat.interval
+            data = []
+            for packet in packets:
+                # None is put in the queue only to wake up the thread
+                if packet != None:
+                    packed = packet.pack_data(version)
+                    self.stats.packet_out(packet.type, len(packed))
+                    data.append(packed)
+            if len(data) > 0:
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Sending %d packets, %d bytes", len(data), sum(len(d) for d in data))
+                try:
+                    self.stats.send_calls += send_buffers(receiver, data)
+                except OSError:
+                    print("Error in sending data. Closing send-thread.")
+                    self._uncontrolled_closure()
+                    return
+
             # Check the interrupt queue
             if self._interrupt_queue.empty() == False:
                 controlled_interrupt = self._interrupt_queue.get(block=False)
                 if controlled_interrupt:
                     self._controlled_closure(receiver, True)
+                    self._stop_receiving(receiver)
                 else:
                     self._uncontrolled_closure()
                 print("Closing send-thread.")
                 return
 
-            if self.send_queue.empty() == False:
-                packet = self.send_queue.get(False)
-                data = packet.pack_data()
-                try:
-                    receiver.send(data)
-                except OSError:
-                    print("Error in sending data. Closing send-thread.")
-                    self._uncontrolled_closure()
-                    return
-
-            sleep(0.001)
+    def _stop_receiving(self, receiver):
+        # The recv-thread blocks until the other end answers the closure,
+        # wake it up if the answer does not come in time
+        self._recv_thread.join(self.CLOSE_TIMEOUT)
+        if self._recv_thread.is_alive():
+            try:
+                receiver.shutdown(sock.SHUT_RDWR)
+            except OSError:
+                pass
 
     def _receive(self, sender):
-        sender.settimeout(0.1)
+        # Block until data arrives, the send-thread shuts the socket down if the connection stalls
+        sender.settimeout(None)
+        framer = StreamFramer()
 
         while True:
             try:
-                data = sender.recv(BUFFER_SIZE)
-                if len(data) > 0:
-                    packet = Packet(data)
-                    print("real size:", len(data) / 4)
-                    print("packet type:", packet.type)
-
-                    if self._incomplete_packet != None:
-                        packet = self._fill_incomplete_packet(Packet)
-
-                    if not self._incomplete_packet:
-                        if len(packet.get_data()) < packet.length:
-                            self._incomplete_packet = packet
-
-                        if packet.type == Packet.T_CLOSE:
-                            #print("data:", packet.get_data(include_header=False))
-                            if packet.get_data(include_header=False)[0] == 0:
-                                # Initiator
-                                initiator = False
-                            else:
-                                initiator = True
-                            # Send the close packet back
-                            self._controlled_closure(sender, initiator)
-                            # Inform the send-thread that the connection is closing
-                            self._interrupt_queue.put(True)
-                            sleep(1)
-                            self.socket.close()
-                            print("Closing recv-thread")
-                            return
-                        self.recv_queue.put(packet)
-            except timeout:
-                pass
+                self.stats.recv_calls += 1
+                received = framer.recv_from(sender)
             except OSError:
                 print("Error in receiving data. Closing recv-thread.")
-                self._interrupt_queue.put(False)
+                self._interrupt(False)
                 self._uncontrolled_closure()
                 return
 
-    def _fill_incomplete_packet(self, packet):
-        incomplete_data = self._incomplete_packet.get_data(include_header=False)
-        incomplete_length = self._incomplete_packet.length
-        full_length = incomplete_length
-        updated_data = incomplete_data.extend(packet.get_data(include_header=False))
-        if packet.length + incomplete_length < full_length:
-            self._incomplete_packet = Packet(updated_data)
-        else:
-            self._incomplete_packet = None
-        return Packet(updated_data)
+            if received == 0:
+                # The other end has shut down the connection
+                if self.connected:
+                    print("Connection was closed by the other end. Closing recv-thread.")
+                    self._interrupt(False)
+                    self._uncontrolled_closure()
+                return
+
+            try:
+                for frame in framer.frames():
+                    packet = Packet(frame, version=framer.version)
+                    self.stats.packet_in(packet.type, len(frame))
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug("Received packet type %d, %d bytes", packet.type, len(frame))
+                    if self.version == None:
+                        # The first packet completes the handshake
+                        self._set_version(Packet.negotiate(packet))
+                        framer.version = self.version
+                        if packet.type == Packet.T_HELLO:
+                            continue
+                    if packet.type == Packet.T_PING:
+                        self.send_queue.put(Heartbeat.pong(packet))
+                        continue
+                    if packet.type == Packet.T_PONG:
+                        if self.heartbeat != None:
+                            self.heartbeat.received_pong(packet)
+                        continue
+                    if packet.type == Packet.T_CLOSE:
+                        if packet.get_data(include_header=False)[0] == 0:
+                            # Initiator
+                            initiator = False
+                        else:
+                            initiator = True
+                        # Send the close packet back
+                        self._controlled_closure(sender, initiator)
+                        # Inform the send-thread that the connection is closing
+                        self._interrupt(True)
+                        sleep(1)
+                        self.socket.close()
+                        print("Closing recv-thread")
+                        return
+                    self.recv_queue.put(packet)
+                    self._wake()
+            except (FramingError, struct.error, ValueError) as e:
+                self.stats.decode_errors += 1
+                print("Received a malformed packet:", e)
+                print("Closing recv-thread.")
+                self._interrupt(False)
+                self._uncontrolled_closure()
+                return
 
     def get_packet(self, packet_type=None):
         """
-        Get a packet from the receive queue.
-        If a packet with the specified type is not found in the queue, return None.
-        If a packet_type is not provided, the first packet in the queue will be returned.
-        If there are no packets in the queue, return None.
+        Get the oldest received packet of a type.
+        If a packet with the specified type has not been received, return None.
+        If a packet_type is not provided, the oldest packet of any type will be returned.
 
         :param int packet_type: one of the T_ prefixed constants of the Packet class
-        :return: the first packet in the queue that is of the type packet_type
+        :return: the oldest received packet that is of the type packet_type
         :rtype: Packet or None
         """
+        return self.recv_queue.get(packet_type)
 
-        if self.recv_queue.empty() == False:
-            if packet_type == None:
-                packet = self.recv_queue.get(block=False)
-                return packet
-            else:
-                packet = self.recv_queue.get(block=False)
-                if packet.type == packet_type:
-                    return packet
-                else:
-                    # The packet type is wrong so it will be put back in the queue
-                    self.recv_queue.put(packet)
-                    return None
-        else:
-            return None
+    def get_all(self, packet_type):
+        """
+        Get every received packet of a type.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class
+        :return: the packets in the order they were received
+        :rtype: list
+        """
+        return self.recv_queue.get_all(packet_type)
+
+    def wait_packet(self, packet_type=None, timeout=None):
+        """
+        Get the oldest received packet of a type, waiting for one to arrive if necessary.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class, None for any type
+        :param float timeout: how many seconds to wait at most, None to wait forever
+        :return: the oldest received packet that is of the type packet_type, None if none arrived in time
+        :rtype: Packet or None
+        """
+        return self.recv_queue.wait(packet_type, timeout)
@@ -0,0 +1,265 @@
+"""
+A headless dedicated server that hosts any number of matches in one process.
+
+Clients connect with networking.client.Client (or AsyncClient) exactly like they
+would connect to a player hosting with networking.server.Server.
+Clients are paired into matches in the order they connect and the server relays
+packets between the two players of a match, dropping the ones that break the turn order.
+Every socket is served by the same asyncio event loop.
+
+Run with: python -m networking.dedicated --ip 0.0.0.0 --port 7777
+"""
+import argparse
+import asyncio
+import random
+from networking.packet import Packet
+from networking.aioconnection import PacketProtocol
+from networking.heartbeat import Heartbeat
+from networking.stats import ConnectionStats
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+class Match():
+    """
+    Game state of two paired players as seen by the server.
+
+    :attr list self.players: the two players of the match
+    :attr Player self.turn: the player allowed to strike next, None if nobody is
+    :attr Player self.struck: the player who has to answer the latest strike, None if nobody has to
+    :attr bool self.over: has the match ended
+    """
+    def __init__(self, first, second):
+        """
+        The constructor.
+
+        :param Player first: the player who connected first
+        :param Player second: the player who connected second
+        """
+        self.players = [first, second]
+        self.turn = None
+        self.struck = None
+        self.over = False
+        first.match = self
+        second.match = self
+
+    def opponent(self, player):
+        """
+        Get the other player of the match.
+
+        :param Player player: a player of the match
+        :return: the opponent of the player
+        :rtype: Player
+        """
+        if self.players[0] is player:
+            return self.players[1]
+        return self.players[0]
+
+    def start(self):
+        """
+        Relay the ready messages that were received before the match was made
+        and decide who goes first if both players are ready.
+        """
+        for player in self.players:
+            if player.ready:
+                self.opponent(player).send(Packet([], Packet.T_READY))
+        self.check_ready()
+
+    def check_ready(self):
+        if self.players[0].ready and self.players[1].ready and self.turn == None:
+            self.turn = random.choice(self.players)
+            self.turn.send(Packet([], Packet.T_YOUR_TURN))
+
+    def handle(self, player, packet):
+        """
+        Relay a packet to the opponent if it is allowed by the rules.
+
+        :param Player player: the player who sent the packet
+        :param Packet packet: the received packet
+        """
+        opponent = self.opponent(player)
+        if self.over:
+            return
+        if packet.type == Packet.T_READY:
+            if not player.ready:
+                player.ready = True
+                opponent.send(packet)
+                self.check_ready()
+        elif packet.type == Packet.T_SHIP_POSITIONS:
+            opponent.send(packet)
+        elif packet.type == Packet.T_STRIKE:
+            if self.turn is player and self.struck == None:
+                self.turn = None
+                self.struck = opponent
+                opponent.send(packet)
+        elif packet.type == Packet.T_STRIKE_RESULT:
+            if self.struck is player:
+                # The player who was struck has the next turn
+                self.struck = None
+                self.turn = player
+                opponent.send(packet)
+        elif packet.type == Packet.T_GAME_OVER:
+            # Only the player who has just been struck can lose
+            if self.turn is player:
+                self.over = True
+                self.turn = None
+                opponent.send(packet)
+
+class Player(PacketProtocol):
+    """
+    A connected client of the dedicated server.
+
+    :attr DedicatedServer self.server: the server the player is connected to
+    :attr Match self.match: the match of the player, None if the player is waiting for an opponent
+    :attr bool self.ready: has the player placed all ships
+    :parent: networking.aioconnection.PacketProtocol
+    """
+    def __init__(self, server):
+        """
+        The constructor.
+
+        :param DedicatedServer server: the server the player is connected to
+        """
+        stats = ConnectionStats()
+        heartbeat = None
+        if server.heartbeat_interval != None:
+            heartbeat = Heartbeat(stats, server.heartbeat_interval, server.heartbeat_misses)
+        PacketProtocol.__init__(self, self._on_packet, self._on_lost, stats, heartbeat)
+        self.server = server
+        self.match = None
+        self.ready = False
+
+    def connection_made(self, transport):
+        PacketProtocol.connection_made(self, transport)
+        self.server.join(self)
+
+    def _on_packet(self, packet):
+        if packet.type == Packet.T_CLOSE:
+            self.server.leave(self, True)
+        elif self.match != None:
+            self.match.handle(self, packet)
+        elif packet.type == Packet.T_READY:
+            # Relayed when the player gets an opponent
+            self.ready = True
+
+    def _on_lost(self, exc):
+        if not self.closing:
+            self.closing = True
+            self.server.leave(self, False)
+
+class DedicatedServer():
+    """
+    Accepts clients on a single event loop and pairs them into matches.
+
+    :attr Player self.waiting: the player waiting for an opponent, None if nobody is waiting
+    :attr int self.player_count: how many clients are connected
+    :attr int self.match_count: how many matches are being played
+    :attr float self.heartbeat_interval: seconds between ping packets sent to each client, None to disable
+    :attr int self.heartbeat_misses: how many unanswered pings drop a client
+    """
+    def __init__(self, heartbeat_interval=5.0, heartbeat_misses=3):
+        """
+        The constructor.
+
+        :param float heartbeat_interval: seconds between ping packets sent to each client, None to disable
+        :param int heartbeat_misses: how many unanswered pings drop a client
+        """
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_misses = heartbeat_misses
+        self.waiting = None
+        self.player_count = 0
+        self.match_count = 0
+
+    def join(self, player):
+        """
+        Pair a new player with the waiting player or make the new player wait.
+
+        :param Player player: the connected player
+        """
+        self.player_count += 1
+        if self.waiting == None:
+            self.waiting = player
+        else:
+            match = Match(self.waiting, player)
+            self.waiting = None
+            self.match_count += 1
+            match.start()
+
+    def leave(self, player, controlled):
+        """
+        Remove a player and end the match the player was in.
+        The opponent is informed with a close packet if the closure was controlled
+        and by dropping the connection if it was not.
+
+        :param Player player: the leaving player
+        :param bool controlled: did the player close the connection with a close packet
+        """
+        self.player_count -= 1
+        player.close()
+        if self.waiting is player:
+            self.waiting = None
+        if player.match != None:
+            opponent = player.match.opponent(player)
+            player.match = None
+            opponent.match = None
+            self.match_count -= 1
+            if not opponent.closing:
+                self.player_count -= 1
+                if controlled:
+                    opponent.send(Packet([0], Packet.T_CLOSE))
+                    opponent.close()
+                else:
+                    opponent.closing = True
+                    opponent.transport.abort()
+
+    async def serve(self, ip, port, backlog=1024):
+        """
+        Accept clients until the task is cancelled.
+
+        :param string ip: The IPv4 address
+        :param int port: The port
+        :param int backlog: how many unaccepted connections the system allows
+        """
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: Player(self), ip, port, backlog=backlog)
+        print(f"Dedicated server started on {ip}:{port}")
+        async with server:
+            await server.serve_forever()
+
+def raise_open_file_limit():
+    """
+    Raise the soft limit of open file descriptors to the hard limit.
+    Every connected client takes one descriptor.
+
+    :return: the new soft limit, None if it cannot be changed on this platform
+    :rtype: int or None
+    """
+    if resource == None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+    return soft
+
+def main():
+    parser = argparse.ArgumentParser(description="Warships dedicated server")
+    parser.add_argument("--ip", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7777)
+    args = parser.parse_args()
+    limit = raise_open_file_limit()
+    if limit != None:
+        print("Open file limit:", limit)
+    try:
+        asyncio.run(DedicatedServer().serve(args.ip, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from networking.packet import Packet
+
+BUFFER_SIZE = 2048
+# Upper bound for a single packet, anything larger is treated as a corrupted stream
+MAX_FRAME_SIZE = 1 << 20
+
+class FramingError(Exception):
+    pass
+
+class StreamFramer():
+    """
+    Splits a TCP byte stream into whole packets.
+
+    Received bytes are written straight into a preallocated buffer with recv_into()
+    and complete packets are handed out as memoryview slices of that buffer,
+    so no bytes objects are allocated per receive call.
+    Any number of packets can be split out of a single read.
+
+    :attr bytearray self._buffer: the receive buffer
+    :attr memoryview self._view: view of the whole receive buffer
+    :attr int self._start: index of the first unread byte in the buffer
+    :attr int self._end: index after the last received byte in the buffer
+    :attr int self._pending: size of the incomplete packet at the start of the unread bytes, 0 if unknown
+    :attr int self.version: the packet codec version used for reading packet sizes
+    """
+    def __init__(self, size=BUFFER_SIZE, max_frame_size=MAX_FRAME_SIZE, version=Packet.V1):
+        """
+        The constructor.
+
+        :param int size: the initial size of the receive buffer in bytes
+        :param int max_frame_size: the largest packet size in bytes that is accepted
+        :param int version: the packet codec version used for reading packet sizes
+        """
+        self.max_frame_size = max_frame_size
+        self.version = version
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._pending = 0
+
+    def writable(self):
+        """
+        Get the free space at the end of the buffer.
+        Unread bytes are moved to the start of the buffer if they are in the way
+        and the buffer is grown if an incomplete packet does not fit in it.
+        Call commit() after writing into the returned view.
+
+        :return: a writable view of the free space
+        :rtype: memoryview
+        """
+        unread = self._end - self._start
+        if unread == 0:
+            self._start = 0
+            self._end = 0
+        elif self._end == len(self._buffer) or self._pending > len(self._buffer) - self._start:
+            if self._pending > len(self._buffer):
+                # The incomplete packet is larger than the whole buffer
+                new_buffer = bytearray(self._pending)
+                new_buffer[:unread] = self._view[self._start:self._end]
+                self._buffer = new_buffer
+                self._view = memoryview(self._buffer)
+            else:
+                self._view[:unread] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = unread
+        return self._view[self._end:]
+
+    def commit(self, nbytes):
+        """
+        Mark bytes written into the view returned by writable() as received.
+
+        :param int nbytes: how many bytes were written
+        """
+        self._end += nbytes
+
+    def recv_from(self, sock):
+        """
+        Receive bytes from a socket directly into the buffer.
+
+        :param socket.socket sock: the socket to read from
+        :return: how many bytes were received, 0 if the other end has shut down the connection
+        :rtype: int
+        """
+        nbytes = sock.recv_into(self.writable())
+        self.commit(nbytes)
+        return nbytes
+
+    def frames(self):
+        """
+        Split out every complete packet from the received bytes.
+        The returned views point into the receive buffer,
+        so they must be consumed before the next call to writable() or recv_from().
+
+        :return: views of the complete packets in the order they were received
+        :rtype: generator of memoryview
+        :raises FramingError: if a packet header contains an invalid size
+        """
+        # The version is read on every iteration because it may change after the handshake packet
+        while True:
+            unread = self._view[self._start:self._end]
+            size = Packet.frame_size(unread, self.version)
+            if size == None:
+                self._pending = 0
+                return
+            if size < Packet.MIN_FRAME_SIZE[self.version] or size > self.max_frame_size:
+                raise FramingError(f"Invalid packet size: {size} bytes")
+            if len(unread) < size:
+                self._pending = size
+                return
+            self._start += size
+            yield unread[:size]
@@ -0,0 +1,77 @@
+from time import monotonic
+from networking.packet import Packet
+
+class Heartbeat():
+    """
+    Keeps track of the ping packets sent on a connection and the pong packets answering them.
+    Each pong gives a round-trip time that is recorded in the connection stats.
+    Heartbeats are only exchanged with ends that support the version 2 codec.
+
+    :attr float self.interval: seconds between ping packets
+    :attr int self.max_missed: how many unanswered pings mean that the other end has stalled
+    :attr networking.stats.ConnectionStats self.stats: the stats where round-trip times are recorded
+    :attr dict self._sent: send times of the unanswered pings by sequence number
+    """
+    def __init__(self, stats, interval=1.0, max_missed=5):
+        """
+        The constructor.
+
+        :param networking.stats.ConnectionStats stats: the stats where round-trip times are recorded
+        :param float interval: seconds between ping packets
+        :param int max_missed: how many unanswered pings mean that the other end has stalled
+        """
+        self.stats = stats
+        self.interval = interval
+        self.max_missed = max_missed
+        self._sequence = 0
+        self._sent = {}
+
+    def ping(self):
+        """
+        Create the next ping packet.
+
+        :return: the ping packet
+        :rtype: Packet
+        """
+        self._sequence += 1
+        self._sent[self._sequence] = monotonic()
+        return Packet([self._sequence], Packet.T_PING)
+
+    @staticmethod
+    def pong(ping):
+        """
+        Create the answer to a received ping packet.
+
+        :param Packet ping: the received ping packet
+        :return: the pong packet
+        :rtype: Packet
+        """
+        return Packet(ping.get_data(include_header=False), Packet.T_PONG)
+
+    def received_pong(self, pong):
+        """
+        Record the round-trip time of an answered ping.
+
+        :param Packet pong: the received pong packet
+        """
+        sent = self._sent.pop(pong.get_data(include_header=False)[0], None)
+        if sent != None:
+            self.stats.rtt.record(monotonic() - sent)
+
+    def stalled(self):
+        """
+        See if the other end has left too many pings unanswered.
+
+        :rtype: bool
+        """
+        return len(self._sent) >= self.max_missed
+
+    @staticmethod
+    def supported(version):
+        """
+        See if heartbeats can be sent with a codec version.
+
+        :param int version: the agreed codec version
+        :rtype: bool
+        """
+        return version != None and version >= Packet.V2
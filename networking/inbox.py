@@ -0,0 +1,114 @@
+from collections import deque
+from threading import Condition
+
+class PacketInbox():
+    """
+    Received packets sorted by type into first-in-first-out queues.
+    Getting the next packet of a type does not touch packets of other types
+    and the arrival order is kept within each type.
+    The inbox can be used from several threads.
+
+    :attr dict self._queues: deques of (arrival number, packet) tuples by packet type
+    :attr threading.Condition self._condition: guards the queues and wakes up waiting threads
+    :attr int self._arrivals: how many packets have been put in the inbox
+    """
+    def __init__(self):
+        """
+        The constructor.
+        """
+        self._queues = {}
+        self._condition = Condition()
+        self._arrivals = 0
+
+    def put(self, packet):
+        """
+        Put a received packet in the queue of its type.
+
+        :param Packet packet: the received packet
+        """
+        with self._condition:
+            queue = self._queues.get(packet.type)
+            if queue == None:
+                queue = deque()
+                self._queues[packet.type] = queue
+            queue.append((self._arrivals, packet))
+            self._arrivals += 1
+            self._condition.notify_all()
+
+    def get(self, packet_type=None):
+        """
+        Take the oldest packet of a type.
+        If a packet_type is not provided, the oldest packet of any type is taken.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class
+        :return: the oldest packet, None if there are no packets of the type
+        :rtype: Packet or None
+        """
+        with self._condition:
+            return self._take(packet_type)
+
+    def get_all(self, packet_type):
+        """
+        Take every packet of a type.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class
+        :return: the packets in the order they were received
+        :rtype: list
+        """
+        with self._condition:
+            queue = self._queues.get(packet_type)
+            if queue == None:
+                return []
+            packets = [packet for (_, packet) in queue]
+            queue.clear()
+            return packets
+
+    def wait(self, packet_type=None, timeout=None):
+        """
+        Take the oldest packet of a type, waiting for one to arrive if there are none.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class, None for any type
+        :param float timeout: how many seconds to wait at most, None to wait forever
+        :return: the oldest packet, None if none arrived in time
+        :rtype: Packet or None
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._has(packet_type), timeout)
+            return self._take(packet_type)
+
+    def qsize(self, packet_type=None):
+        """
+        Count the packets of a type, or of every type if packet_type is not provided.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class
+        :return: how many packets are in the inbox
+        :rtype: int
+        """
+        with self._condition:
+            if packet_type == None:
+                return sum(len(queue) for queue in self._queues.values())
+            queue = self._queues.get(packet_type)
+            return 0 if queue == None else len(queue)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def _has(self, packet_type):
+        if packet_type == None:
+            return any(self._queues.values())
+        return bool(self._queues.get(packet_type))
+
+    def _take(self, packet_type):
+        if packet_type == None:
+            # The oldest packet is at the head of one of the queues
+            oldest = None
+            for queue in self._queues.values():
+                if queue and (oldest == None or queue[0][0] < oldest[0][0]):
+                    oldest = queue
+            if oldest == None:
+                return None
+            return oldest.popleft()[1]
+        queue = self._queues.get(packet_type)
+        if not queue:
+            return None
+        return queue.popleft()[1]
@@ -0,0 +1,64 @@
+"""
+Connects a Server and a Client to each other on the loopback interface.
+Used by the benchmarks and the headless games.
+"""
+import socket
+import time
+from networking.server import Server, AsyncServer
+from networking.client import Client, AsyncClient
+
+def free_port():
+    """
+    Ask the system for a free TCP port on the loopback interface.
+
+    :rtype: int
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def connect_pair(use_async=False, nodelay=True, timeout=10.0, heartbeat_interval=None):
+    """
+    Connect a server and a client to each other on the loopback interface.
+    Heartbeats are disabled by default so that they do not mix with measured traffic.
+
+    :param bool use_async: use the asyncio connections instead of the threaded ones
+    :param bool nodelay: disable Nagle's algorithm on both ends
+    :param float timeout: how many seconds to wait for the connection and the handshake
+    :param float heartbeat_interval: seconds between ping packets, None to disable heartbeats
+    :return: the connected server and client
+    :rtype: tuple
+    """
+    server_class, client_class = (AsyncServer, AsyncClient) if use_async else (Server, Client)
+    server = server_class(nodelay, heartbeat_interval=heartbeat_interval)
+    client = client_class(nodelay, heartbeat_interval=heartbeat_interval)
+    port = free_port()
+    server.create("127.0.0.1", port).start()
+    client_thread = client.create("127.0.0.1", port)
+    deadline = time.monotonic() + timeout
+    while not (client.connected and server.connected):
+        if not client.connected and not client_thread.is_alive():
+            # The server was not listening yet, forget the failed attempt before trying again
+            client.check_closure()
+            client_thread = client.create("127.0.0.1", port)
+            client_thread.start()
+        if time.monotonic() > deadline:
+            raise TimeoutError("Could not connect to the local server")
+        time.sleep(0.01)
+    for connection in (server, client):
+        if not connection.wait_negotiated(max(0.0, deadline - time.monotonic())):
+            raise TimeoutError("The handshake did not finish")
+    return (server, client)
+
+def close_pair(server, client, timeout=5.0):
+    """
+    Close a pair made by connect_pair() and wait until both ends have noticed.
+    """
+    client.close()
+    deadline = time.monotonic() + timeout
+    closed = [None, None]
+    while None in closed and time.monotonic() < deadline:
+        for i, connection in enumerate((server, client)):
+            if closed[i] == None:
+                closed[i] = connection.check_closure()
+        time.sleep(0.01)
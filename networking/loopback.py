@@ -0,0 +1,101 @@
+from threading import Lock
+from networking.connection import Connection
+from networking.packet import Packet
+
+class DirectQueue():
+    """
+    The send queue of a LoopbackConnection.
+    Putting a packet delivers it to the inbox of the other end at once, without encoding it.
+    Like the queues of the other connections, None can be put to wake up the sender and is dropped.
+
+    :attr LoopbackConnection self._sender: the end that owns the queue
+    """
+    def __init__(self, sender):
+        """
+        The constructor.
+
+        :param LoopbackConnection sender: the end that owns the queue
+        """
+        self._sender = sender
+
+    def put(self, packet, block=True, timeout=None):
+        if packet != None:
+            self._sender._deliver(packet)
+
+    def put_nowait(self, packet):
+        self.put(packet)
+
+    def qsize(self):
+        # Packets never wait in the queue
+        return 0
+
+    def empty(self):
+        return True
+
+class LoopbackConnection(Connection):
+    """
+    One end of a connection inside the process, for playing against the computer and for tests.
+    Packets are passed to the other end as objects through its inbox, so there are no sockets,
+    no threads and no packing or unpacking. The ends are connected from the start.
+    Create the ends with loopback_pair().
+
+    :attr LoopbackConnection self.peer: the other end
+    :attr bool self.is_host: does this end decide who goes first
+    :attr threading.Lock self._lock: guards the closure so that both ends see it only once
+    :parent: networking.connection.Connection
+    """
+    def __init__(self, is_host=False):
+        """
+        The constructor.
+
+        :param bool is_host: does this end decide who goes first
+        """
+        Connection.__init__(self, heartbeat_interval=None)
+        self.is_host = is_host
+        self.peer = None
+        self.send_queue = DirectQueue(self)
+        self.version = Packet.VERSION
+        self._negotiated.set()
+        self._lock = Lock()
+
+    def create(self, ip=None, port=None):
+        raise NotImplementedError("The ends of a loopback connection are created with loopback_pair()")
+
+    def _deliver(self, packet):
+        if not self.connected:
+            # Like a closed socket, a closed connection does not send anything
+            return
+        self.stats.packet_out(packet.type, 0)
+        self.peer.stats.packet_in(packet.type, 0)
+        self.peer.recv_queue.put(packet)
+        self.peer._wake()
+
+    def close(self):
+        """
+        Close both ends of the connection. Both ends see it as a controlled closure.
+        """
+        with self._lock:
+            if not self.connected:
+                return
+            for end in (self, self.peer):
+                end.connected = False
+                end._closure_queue.put(True)
+        self._wake()
+        self.peer._wake()
+
+def loopback_pair():
+    """
+    Create the two connected ends of a loopback connection.
+
+    :return: the host end and the guest end
+    :rtype: tuple
+    """
+    host = LoopbackConnection(True)
+    guest = LoopbackConnection(False)
+    host.peer = guest
+    guest.peer = host
+    # Both ends share the lock so that a closure from either end is seen once
+    guest._lock = host._lock
+    host.connected = True
+    guest.connected = True
+    return (host, guest)
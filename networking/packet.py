@@ -1,5 +1,59 @@
 import struct
 
+def _write_varint(value, out):
+    """
+    Append an unsigned integer to a bytearray as a varint (7 bits per byte, least significant first).
+    """
+    if value < 0:
+        raise ValueError(f"Cannot encode a negative value as a varint: {value}")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, offset):
+    """
+    Read a varint from data starting at offset.
+
+    :return: the value and the offset after the varint
+    :rtype: tuple
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (result, offset)
+        shift += 7
+
+def _compile_v2(schema):
+    """
+    Precompile the structs for a version 2 schema.
+    Varints are packed as single bytes, so the structs can only be used for them when every varint is below 0x80.
+
+    :return: the struct for packing, the struct for unpacking, the payload size and whether the schema has varints,
+             None if the schema cannot be packed with a struct
+    :rtype: tuple or None
+    """
+    if schema == None or ("V" in schema and "H" in schema):
+        return None
+    items = schema.replace("V", "B")
+    return (struct.Struct(">BB" + items), struct.Struct(">xx" + items), struct.calcsize(">" + items), "V" in schema)
+
+def _header_v2(packet_type, length):
+    """
+    Get the header of a version 2 packet: the type and the varint payload length.
+
+    :rtype: bytes
+    """
+    if length < 0x80:
+        return bytes((packet_type, length))
+    header = bytearray([packet_type])
+    _write_varint(length, header)
+    return bytes(header)
+
 class Packet():
     # How many items are in the header
     HEADER_LEN = 2
@@ -16,17 +70,52 @@ class Packet():
     T_STRIKE_RESULT    = 4
     T_GAME_OVER        = 5
     T_YOUR_TURN        = 6
+    T_HELLO            = 7
+    T_PING             = 8
+    T_PONG             = 9
+    # Codec versions
+    # Version 1: a big-endian 32-bit length (in items) and type followed by 32-bit items
+    # Version 2: a one-byte type and a varint payload length followed by a payload described by SCHEMAS
+    V1 = 1
+    V2 = 2
+    # The newest version this implementation supports
+    VERSION = V2
+    # The smallest valid packet in bytes for each version
+    MIN_FRAME_SIZE = {V1: HEADER_BYTES, V2: 2}
+    # Payload schemas of the version 2 codec
+    # B = uint8, H = uint16, V = varint, None = any number of varints
+    SCHEMAS = {
+        T_CLOSE:          "B",
+        T_READY:          "",
+        T_SHIP_POSITIONS: None,
+        T_STRIKE:         "VV",
+        T_STRIKE_RESULT:  "BVV",
+        T_GAME_OVER:      "",
+        T_YOUR_TURN:      "",
+        T_HELLO:          "B",
+        T_PING:           "V",
+        T_PONG:           "V",
+    }
+    # Precompiled structs that pack and unpack a whole version 2 packet in one call for each type
+    _V2_STRUCTS = {t: _compile_v2(s) for t, s in SCHEMAS.items() if _compile_v2(s) != None}
+    # Headers of the version 2 types whose items take one byte each when they are below 0x80
+    _V2_HEADERS = {t: bytes((t, len(s))) for t, s in SCHEMAS.items() if s != None and "H" not in s}
+    # The version 2 types with any number of varints
+    _V2_VARIABLE = frozenset(t for t, s in SCHEMAS.items() if s == None)
+    # Precompiled version 1 structs by item count
+    _V1_STRUCTS = {}
 
-    def __init__(self, data, packet_type=None):
+    def __init__(self, data, packet_type=None, version=V1):
         # For incoming packets the type is initally unknown
         # but when creating a new packet, a packet_type should be provided
         # If packet_type is not provided the data is assumed to be in bytes format
+        # encoded with the codec version given by version
         self.__data = None
         self.type = None
         self.length = None
 
         if packet_type == None:
-            unpacked_data = self.unpack_data(data)
+            unpacked_data = self.unpack_data(data, version)
             self.type = unpacked_data[self.I_TYPE]
             self.length = len(unpacked_data)
             self.__data = unpacked_data
@@ -34,6 +123,31 @@ class Packet():
             self.type = packet_type
             self.set_data(data)
 
+    @classmethod
+    def hello(cls):
+        """
+        Create the handshake packet that tells the other end which codec versions are supported.
+        The handshake packet is always sent with version 1.
+
+        :return: the handshake packet
+        :rtype: Packet
+        """
+        return cls([cls.VERSION], cls.T_HELLO)
+
+    @classmethod
+    def negotiate(cls, packet):
+        """
+        Decide the codec version from the first packet received from the other end.
+        An end that does not send a handshake packet only supports version 1.
+
+        :param Packet packet: the first received packet
+        :return: the highest version both ends support
+        :rtype: int
+        """
+        if packet.type == cls.T_HELLO:
+            return max(cls.V1, min(cls.VERSION, packet.get_data(include_header=False)[0]))
+        return cls.V1
+
     def get_data(self, include_header=True):
         if include_header:
             return self.__data
@@ -58,29 +172,158 @@ class Packet():
         self.length = length
         self.__data = full_data
 
-    def pack_data(self):
+    def pack_data(self, version=V1):
         """
         Convert the data into bytes.
-        
+
+        :param int version: the codec version
         :return: the packed data
         :rtype: bytes
         """
-        packed_data = struct.pack(">{}i".format(self.length), *self.__data)
+        if version == self.V2:
+            return self._pack_v2()
+        packed_data = self._v1_struct(self.length).pack(*self.__data)
         return packed_data
 
-    def unpack_data(self, data):
+    def _pack_v2(self):
+        data = self.__data
+        packet_type = self.type
+        # Items below 0x80 take one byte both as uint8 and as a varint, so the payload is the items as bytes
+        # The game sends only such items, anything else is packed by the general code below
+        try:
+            body = bytes(data[self.HEADER_LEN:])
+        except (ValueError, TypeError):
+            body = b"\x80"
+        if body.isascii():
+            header = self._V2_HEADERS.get(packet_type)
+            # The second byte of a fixed header is the item count
+            if header != None and header[1] == len(body):
+                return header + body
+            if packet_type in self._V2_VARIABLE:
+                return _header_v2(packet_type, len(body)) + body
+
+        structs = self._V2_STRUCTS.get(packet_type)
+        if structs != None:
+            (pack_struct, _, size, varints) = structs
+            try:
+                # Items of 0x80 and above fit in a uint8 but not in a one-byte varint
+                if not varints:
+                    return pack_struct.pack(packet_type, size, *data[self.HEADER_LEN:])
+            except struct.error:
+                # Invalid data is reported below
+                pass
+
+        fields = self.SCHEMAS.get(packet_type, False)
+        if fields == False:
+            raise ValueError(f"Unknown packet type: {packet_type}")
+        if fields != None and len(fields) != self.length - self.HEADER_LEN:
+            raise ValueError(f"Packet type {packet_type} takes {len(fields)} items, got {self.length - self.HEADER_LEN}")
+        body = bytearray()
+        for i, value in enumerate(data[self.HEADER_LEN:]):
+            kind = "V" if fields == None else fields[i]
+            if kind == "V":
+                _write_varint(value, body)
+            elif kind == "B":
+                body.append(value)
+            else:
+                body += value.to_bytes(2, byteorder='big')
+        return _header_v2(packet_type, len(body)) + body
+
+    @classmethod
+    def _v1_struct(cls, count):
+        structure = cls._V1_STRUCTS.get(count)
+        if structure == None:
+            structure = struct.Struct(">{}i".format(count))
+            cls._V1_STRUCTS[count] = structure
+        return structure
+
+    @classmethod
+    def frame_size(cls, data, version=V1):
+        """
+        Read the size of the packet that starts at the beginning of the data.
+
+        :param data: received bytes starting with a packet header
+        :type data: bytes or memoryview
+        :param int version: the codec version
+        :return: the size of the whole packet in bytes, None if the header is incomplete, -1 if it is invalid
+        :rtype: int or None
+        """
+        if version == cls.V2:
+            # Type byte followed by the varint payload length
+            length = 0
+            for i in range(1, min(len(data), 6)):
+                byte = data[i]
+                length |= (byte & 0x7F) << (7 * (i - 1))
+                if byte < 0x80:
+                    return i + 1 + length
+            if len(data) >= 6:
+                # The length does not fit in five bytes
+                return -1
+            return None
+        if len(data) < 4:
+            return None
+        return int.from_bytes(data[:4], byteorder='big') * 4
+
+    def unpack_data(self, data, version=V1):
         """
         Convert the data into a tuple of integers.
-        
-        :param bytes data: the data to be unpacked
+
+        :param data: the data to be unpacked
+        :type data: bytes or memoryview
+        :param int version: the codec version
         :return: the unpacked data
         :rtype: tuple
         """
+        if version == self.V2:
+            return self._unpack_v2(data)
         # Read the size of the data from the header
         size = int.from_bytes(data[:4], byteorder='big')
-        print("unpacking:", data)
-        print("packet size", size)
         # Unpack
-        unpacked = struct.unpack(">{}i".format(size), data)
+        unpacked = self._v1_struct(size).unpack(data)
         return unpacked
 
+    def _unpack_v2(self, data):
+        packet_type = data[0]
+        structs = self._V2_STRUCTS.get(packet_type)
+        if structs != None and data[1] == structs[2] and len(data) == structs[2] + 2:
+            # When the payload length equals the item count every varint takes one byte
+            if structs[2] == 0:
+                return (self.HEADER_LEN, packet_type)
+            payload = structs[1].unpack(data)
+            return (self.HEADER_LEN + len(payload), packet_type) + payload
+
+        fields = self.SCHEMAS.get(packet_type, False)
+        if fields == False:
+            raise ValueError(f"Unknown packet type: {packet_type}")
+        try:
+            if data[1] < 0x80:
+                (length, offset) = (data[1], 2)
+            else:
+                (length, offset) = _read_varint(data, 1)
+            body = bytes(data[offset:offset + length])
+            if fields == None and body.isascii():
+                # Every varint takes one byte, so the bytes are the items
+                payload = tuple(body)
+            else:
+                payload = self._read_v2_items(body, fields)
+        except IndexError:
+            raise ValueError("Packet data ended in the middle of an item")
+        return (self.HEADER_LEN + len(payload), packet_type) + payload
+
+    def _read_v2_items(self, body, fields):
+        items = []
+        i = 0
+        while i < len(body):
+            kind = "V" if fields == None else fields[len(items)]
+            if kind == "V":
+                (value, i) = _read_varint(body, i)
+            elif kind == "B":
+                value = body[i]
+                i += 1
+            else:
+                value = int.from_bytes(body[i:i + 2], byteorder='big')
+                i += 2
+            items.append(value)
+        if fields != None and len(items) != len(fields):
+            raise ValueError(f"Packet takes {len(fields)} items, got {len(items)}")
+        return tuple(items)
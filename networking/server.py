@@ -1,10 +1,14 @@
 import socket
 from threading import Thread
 from networking.connection import Connection
+from networking.aioconnection import AsyncConnection
 
 class Server(Connection):
-    def __init__(self):
-        Connection.__init__(self)
+    # The hosting player decides who goes first
+    is_host = True
+
+    def __init__(self, nodelay=True, heartbeat_interval=1.0, heartbeat_misses=5):
+        Connection.__init__(self, nodelay, heartbeat_interval, heartbeat_misses)
 
     def _start(self, ip, port):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -33,3 +37,10 @@ class Server(Connection):
                 pass
 
         self.start_send_recv(client)
+
+class AsyncServer(AsyncConnection, Server):
+    """
+    A server that sends and receives on an asyncio event loop instead of threads.
+    """
+    def __init__(self, nodelay=True, heartbeat_interval=1.0, heartbeat_misses=5):
+        AsyncConnection.__init__(self, nodelay, heartbeat_interval, heartbeat_misses)
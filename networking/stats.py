@@ -0,0 +1,207 @@
+import json
+import re
+from collections import deque
+from networking.packet import Packet
+
+# Packet type names by type number, for example 3 -> "strike"
+TYPE_NAMES = {value: name[2:].lower() for name, value in vars(Packet).items() if name.startswith("T_")}
+
+# Valid label names of the Prometheus text exposition format
+_LABEL_NAME = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+
+def _escape_label(value):
+    """
+    Escape a label value for the Prometheus text exposition format, which requires
+    backslashes, double quotes and line feeds to be escaped.
+
+    :rtype: str
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class LatencyHistogram():
+    """
+    A rolling window of round-trip times.
+
+    :attr collections.deque self.samples: the latest round-trip times in seconds
+    :attr float self.jitter: smoothed variation between consecutive round-trip times in seconds (RFC 3550)
+    :attr int self.count: how many round-trip times have been recorded in total
+    """
+    def __init__(self, window=1000):
+        """
+        The constructor.
+
+        :param int window: how many of the latest round-trip times are kept
+        """
+        self.samples = deque(maxlen=window)
+        self.jitter = 0.0
+        self.count = 0
+
+    def record(self, rtt):
+        """
+        Record a round-trip time.
+
+        :param float rtt: the round-trip time in seconds
+        """
+        if len(self.samples) > 0:
+            self.jitter += (abs(rtt - self.samples[-1]) - self.jitter) / 16
+        self.samples.append(rtt)
+        self.count += 1
+
+    def percentile(self, percent):
+        """
+        Get a percentile of the round-trip times in the window.
+
+        :param float percent: the percentile from 0 to 100
+        :return: the round-trip time in seconds, None if nothing has been recorded
+        :rtype: float or None
+        """
+        if len(self.samples) == 0:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        """
+        Get the count, percentiles and jitter of the round-trip times in seconds.
+
+        :rtype: dict
+        """
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "jitter": self.jitter,
+        }
+
+class ConnectionStats():
+    """
+    Counters of the traffic on one connection.
+    Counting only increments integers so it can be left on in the hot path.
+
+    :attr dict self.packets_in: received packets by packet type
+    :attr dict self.bytes_in: received bytes by packet type
+    :attr dict self.packets_out: sent packets by packet type
+    :attr dict self.bytes_out: sent bytes by packet type
+    :attr int self.recv_calls: receive system calls
+    :attr int self.send_calls: send system calls
+    :attr int self.decode_errors: received data that could not be decoded
+    :attr function self.gauges: returns a dict of current values such as queue depths, or None
+    :attr LatencyHistogram self.rtt: round-trip times measured with heartbeats
+    """
+    def __init__(self, gauges=None):
+        """
+        The constructor.
+
+        :param function gauges: returns a dict of current values such as queue depths
+        """
+        self.packets_in = {}
+        self.bytes_in = {}
+        self.packets_out = {}
+        self.bytes_out = {}
+        self.recv_calls = 0
+        self.send_calls = 0
+        self.decode_errors = 0
+        self.gauges = gauges
+        self.rtt = LatencyHistogram()
+
+    def packet_in(self, packet_type, nbytes):
+        """
+        Count a received packet.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class
+        :param int nbytes: the size of the packet in bytes
+        """
+        self.packets_in[packet_type] = self.packets_in.get(packet_type, 0) + 1
+        self.bytes_in[packet_type] = self.bytes_in.get(packet_type, 0) + nbytes
+
+    def packet_out(self, packet_type, nbytes):
+        """
+        Count a sent packet.
+
+        :param int packet_type: one of the T_ prefixed constants of the Packet class
+        :param int nbytes: the size of the packet in bytes
+        """
+        self.packets_out[packet_type] = self.packets_out.get(packet_type, 0) + 1
+        self.bytes_out[packet_type] = self.bytes_out.get(packet_type, 0) + nbytes
+
+    def snapshot(self):
+        """
+        Get a copy of the counters with packet types as names.
+
+        :return: the counters and the current gauge values
+        :rtype: dict
+        """
+        def by_name(counts):
+            return {TYPE_NAMES.get(t, str(t)): n for t, n in list(counts.items())}
+
+        snapshot = {
+            "packets_in": by_name(self.packets_in),
+            "bytes_in": by_name(self.bytes_in),
+            "packets_out": by_name(self.packets_out),
+            "bytes_out": by_name(self.bytes_out),
+            "recv_calls": self.recv_calls,
+            "send_calls": self.send_calls,
+            "decode_errors": self.decode_errors,
+            "rtt": self.rtt.summary(),
+        }
+        if self.gauges != None:
+            snapshot.update(self.gauges())
+        return snapshot
+
+    def to_json(self):
+        """
+        Dump the counters as JSON.
+
+        :rtype: str
+        """
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def to_prometheus(self, prefix="warships", labels=None):
+        """
+        Dump the counters in the Prometheus text exposition format.
+
+        :param str prefix: prefix of the metric names
+        :param dict labels: labels added to every metric, for example {"peer": "10.0.0.2"}
+        :rtype: str
+        :raises ValueError: if a label name is not valid in the format
+        """
+        base = dict(labels or {})
+        for name in base:
+            if _LABEL_NAME.fullmatch(name) == None:
+                raise ValueError(f"Invalid Prometheus label name: {name!r}")
+        lines = []
+
+        def label_text(extra):
+            merged = dict(base, **extra)
+            if len(merged) == 0:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in sorted(merged.items())) + "}"
+
+        snapshot = self.snapshot()
+        for name in ("packets", "bytes"):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for direction in ("in", "out"):
+                for packet_type, value in sorted(snapshot.pop(f"{name}_{direction}").items()):
+                    labels_text = label_text({"direction": direction, "type": packet_type})
+                    lines.append(f"{metric}{labels_text} {value}")
+        rtt = snapshot.pop("rtt")
+        metric = f"{prefix}_rtt_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for quantile in ("50", "95", "99"):
+            if rtt["p" + quantile] != None:
+                lines.append(f"{metric}{label_text({'quantile': '0.' + quantile})} {rtt['p' + quantile]}")
+        lines.append(f"{metric}_count{label_text({})} {rtt['count']}")
+        lines.append(f"# TYPE {prefix}_rtt_jitter_seconds gauge")
+        lines.append(f"{prefix}_rtt_jitter_seconds{label_text({})} {rtt['jitter']}")
+        for name, value in sorted(snapshot.items()):
+            if name in ("recv_calls", "send_calls", "decode_errors"):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+            else:
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{label_text({})} {value}")
+        return "\n".join(lines) + "\n"
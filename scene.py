@@ -3,14 +3,24 @@ import ship
 import menu
 import settings
 import grid
+from board import Board, StrikeLedger, random_layout
 import networking.client
 import networking.server
 import random
 from networking.packet import Packet
 import color
+import assets
 from crosshair import Crosshair
 from hitmarker import Hitmarker
 from missmarker import Missmarker
+from constants import ASYNC_NETWORKING, TICK_RATE
+from events import EventSource
+from networking.loopback import loopback_pair
+try:
+    import ai
+except ImportError:
+    # The computer opponent needs NumPy, which the rest of the game does not
+    ai = None
 # Initialize fonts
 title_font = pygame.freetype.SysFont("monospace", 70)
 title_font.pad = True
@@ -28,11 +38,33 @@ SCREEN_WIDTH = 1000
 SCREEN_HEIGHT = 700
 
 class SceneHandler():
-    def __init__(self, start_scene, *args):
+    def __init__(self, start_scene, *args, events=None, wakeup=None):
+        """
+        The constructor.
+
+        :param int start_scene: one of the constants of the Scene class
+        :param args: the arguments of the start scene
+        :param events.EventSource events: where the scenes get their input events, the pygame event queue if not provided
+        :param function wakeup: called from other threads when a connection of a scene receives something
+        """
+        if events == None:
+            events = EventSource()
+        self.events = events
+        self.wakeup = wakeup
+        # Scenes are not drawn when running without a display
+        self.headless = False
         self.scene = None
         # Set the scene to start scene
         self.switch(start_scene, *args)
 
+    def watch(self, connection):
+        """
+        Wake up the main loop when the connection receives a packet or changes its state.
+
+        :param networking.connection.Connection connection: the connection of a scene
+        """
+        connection.wakeup = self.wakeup
+
     def switch(self, dest, *args):
         if dest == Scene.MAIN_MENU:
             self.scene = MainMenu(self, *args)
@@ -64,6 +96,11 @@ class Scene():
     END               = 8
     CONNECTION_CLOSED = 9
 
+    # How many times per second the scene is updated at most
+    frame_rate = TICK_RATE
+    # Does the scene have to be drawn on the next frame
+    dirty = True
+
     def __init__(self):
         raise NotImplementedError
 
@@ -74,9 +111,90 @@ class Scene():
         raise NotImplementedError
 
     def draw(self):
+        """
+        Draw the scene on the screen.
+
+        :return: the rectangles that changed, None if the whole screen has to be updated
+        :rtype: list or None
+        """
         raise NotImplementedError
 
+class IncrementalScene(Scene):
+    """
+    A scene that redraws only the areas that have changed since the previous frame.
+    Derived classes implement draw_layers() that draws everything in order and
+    track_changes() that reports the moving parts with track().
+    Areas can also be marked for redrawing with invalidate().
+    The scene must have a disconnect_menu.
+
+    :attr bool self._full_redraw: does the whole screen have to be redrawn on the next frame
+    :attr list self._dirty: the rectangles to redraw on the next frame
+    :attr dict self._tracked: the rectangles and states of the moving parts as they were last drawn
+    """
+    def init_rendering(self):
+        self._full_redraw = True
+        self._dirty = []
+        self._tracked = {}
+
+    def invalidate(self, rect=None):
+        """
+        Mark an area to be redrawn on the next frame.
+
+        :param pygame.Rect rect: the area, None to redraw the whole screen
+        """
+        if rect == None:
+            self._full_redraw = True
+        else:
+            self._dirty.append(pygame.Rect(rect))
+
+    def track(self, name, rect, state=None):
+        """
+        Redraw a moving part if its rectangle or state has changed since the previous frame.
+
+        :param str name: identifies the part
+        :param pygame.Rect rect: the current rectangle of the part, None if the part is not drawn
+        :param state: anything else that changes how the part looks
+        """
+        if rect != None:
+            rect = pygame.Rect(rect)
+        previous = self._tracked.get(name)
+        if previous != None and previous == (rect, state):
+            return
+        if previous != None and previous[0] != None:
+            self._dirty.append(previous[0])
+        if rect != None:
+            self._dirty.append(rect)
+        self._tracked[name] = (rect, state)
+
+    def track_changes(self):
+        raise NotImplementedError
+
+    def draw_layers(self):
+        raise NotImplementedError
+
+    def draw(self):
+        menu_state = (self.disconnect_menu.visible, self.disconnect_menu.sel_num)
+        if self._tracked.get("menu", (None, (False, None)))[1][0] != menu_state[0]:
+            # What was under the menu has to be restored
+            self._full_redraw = True
+        self.track("menu", self.disconnect_menu.rect if menu_state[0] else None, menu_state)
+        self.track_changes()
+        if self._full_redraw:
+            self._full_redraw = False
+            self._dirty = []
+            self.draw_layers()
+            return None
+        dirty = self._dirty
+        self._dirty = []
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.draw_layers()
+        self.screen.set_clip(None)
+        return dirty
+
 class MainMenu(Scene, menu.Menu):
+    frame_rate = 30
+
     def __init__(self, scene_handler, screen):
         self.scene_handler = scene_handler
         # Get center of the screen
@@ -91,27 +209,46 @@ class MainMenu(Scene, menu.Menu):
         self.host_btn.rect.y -= 75
         self.connect_btn = menu.Button("Connect to a server", font)
         self.connect_btn.rect.center = center
+        self.computer_btn = menu.Button("Play against computer", font)
+        self.computer_btn.rect.center = center
+        self.computer_btn.rect.y += 75
         self.exit_btn = menu.Button("Exit", font)
         self.exit_btn.rect.center = center
-        self.exit_btn.rect.y += 100
+        self.exit_btn.rect.y += 175
         self.test_btn = menu.Button("TEST", font)
         self.test_btn.rect.center = center
-        self.test_btn.rect.y += 200
-        buttons = [self.host_btn, self.connect_btn, self.exit_btn, self.test_btn]
+        self.test_btn.rect.y += 250
+        buttons = [self.host_btn, self.connect_btn, self.computer_btn, self.exit_btn, self.test_btn]
         # Pass created components to the menu base class
         menu.Menu.__init__(self, screen, [self.title], buttons)
 
     def check_events(self):
-        selected = self.check_menu_events()
+        selected = self.check_menu_events(self.scene_handler.events.get())
         if selected == self.exit_btn or selected == -1:
             exit()
         elif selected == self.host_btn:
             self.scene_handler.switch(Scene.HOST_MENU, self.screen, "localhost", 7777)
         elif selected == self.connect_btn:
             self.scene_handler.switch(Scene.CONNECT_MENU, self.screen, "localhost", 7777)
+        elif selected == self.computer_btn:
+            self.play_against_computer()
         elif selected == self.test_btn:
             self.scene_handler.switch(Scene.PLACEMENT, self.screen, settings, None)
 
+    def play_against_computer(self):
+        """
+        Start a game against a computer opponent over a loopback connection.
+        The player hosts the game, so the player's end decides who goes first.
+        """
+        if ai == None:
+            print("Cannot play against the computer: NumPy is not installed.")
+            return
+        (connection, opponent_connection) = loopback_pair()
+        self.scene_handler.watch(connection)
+        opponent = ai.AIOpponent(opponent_connection, settings, seed=random.random(), move_delay=0.5)
+        opponent.start()
+        self.scene_handler.switch(Scene.PLACEMENT, self.screen, settings, connection)
+
     def do_logic(self):
         pass
         
@@ -120,6 +257,8 @@ class MainMenu(Scene, menu.Menu):
         self.draw_components()
 
 class HostMenu(Scene, menu.Menu):
+    frame_rate = 30
+
     def __init__(self, scene_handler, screen, ip=None, port=None):
         self.scene_handler = scene_handler
         if ip == None:
@@ -156,7 +295,7 @@ class HostMenu(Scene, menu.Menu):
         menu.Menu.__init__(self, screen, [self.title], selectables)
 
     def check_events(self):
-        selected = self.check_menu_events()
+        selected = self.check_menu_events(self.scene_handler.events.get())
         if selected == self.back_btn or selected == -1:
             self.scene_handler.switch(Scene.MAIN_MENU, self.screen)
         elif selected == self.settings_btn: # settings
@@ -189,12 +328,16 @@ class WaitHostMenu(Scene, menu.Menu):
         pop_rect = pygame.Rect(popup_offset_x, popup_offset_y, SCREEN_WIDTH - popup_offset_x * 2, SCREEN_HEIGHT - popup_offset_y * 2)
         menu.Menu.__init__(self, screen, [self.title], [self.cancel_btn], pop_rect, color.BLUE_GREY)
         # Create the connection
-        self.connection = networking.server.Server()
+        if ASYNC_NETWORKING:
+            self.connection = networking.server.AsyncServer()
+        else:
+            self.connection = networking.server.Server()
+        self.scene_handler.watch(self.connection)
         server_thread = self.connection.create(ip, port)
         server_thread.start()
 
     def check_events(self):
-        selected = self.check_menu_events()
+        selected = self.check_menu_events(self.scene_handler.events.get())
         if selected != None:
             # Stop the connection effort
             self.connection.close()
@@ -209,6 +352,8 @@ class WaitHostMenu(Scene, menu.Menu):
         pass
                 
 class ConnectMenu(Scene, menu.Menu):
+    frame_rate = 30
+
     def __init__(self, scene_handler, screen, ip=None, port=None):
         self.scene_handler = scene_handler
         if ip == None:
@@ -242,7 +387,7 @@ class ConnectMenu(Scene, menu.Menu):
         menu.Menu.__init__(self, screen, [self.title], selectables)
 
     def check_events(self):
-        selected = self.check_menu_events()
+        selected = self.check_menu_events(self.scene_handler.events.get())
         if selected == self.back_btn or selected == -1:
             self.scene_handler.switch(Scene.MAIN_MENU, self.screen)
         elif selected == self.connect_btn:
@@ -279,7 +424,11 @@ class WaitConnectMenu(Scene, menu.Menu):
         pop_rect = pygame.Rect(popup_offset_x, popup_offset_y, SCREEN_WIDTH - popup_offset_x * 2, SCREEN_HEIGHT - popup_offset_y * 2)
         menu.Menu.__init__(self, screen, [self.title], [self.cancel_btn], pop_rect, color.BLUE_GREY)
         # Create the connection
-        self.connection = networking.client.Client()
+        if ASYNC_NETWORKING:
+            self.connection = networking.client.AsyncClient()
+        else:
+            self.connection = networking.client.Client()
+        self.scene_handler.watch(self.connection)
         client_thread = self.connection.create(ip, port)
         client_thread.start()
 
@@ -292,7 +441,7 @@ class WaitConnectMenu(Scene, menu.Menu):
             self.scene_handler.switch(Scene.CONNECT_MENU, self.screen, self.ip, self.port)
 
     def check_events(self):
-        selected = self.check_menu_events()
+        selected = self.check_menu_events(self.scene_handler.events.get())
 
         # Cancel button or escape is pressed
         if selected != None:
@@ -303,10 +452,11 @@ class WaitConnectMenu(Scene, menu.Menu):
     def draw(self):
         self.draw_components()
 
-class Placement(Scene):
+class Placement(IncrementalScene):
     def __init__(self, scene_handler, screen, settings, connection):
         self.scene_handler = scene_handler
         self.screen = screen
+        self.init_rendering()
         self.connection = connection
         self.disconnect_menu = DisconnectMenu(screen)
         self.ready_msg_sent = False
@@ -319,15 +469,14 @@ class Placement(Scene):
         self.grid = grid.Grid((grid_offset_w, grid_offset_h, grid_width, grid_height), settings.rows, settings.columns, 2, color.BLACK)
         # Create sprite groups 
         self.square_group = self.grid.get_square_group(color.GREEN)
-        self.reserved_squares = pygame.sprite.Group()
+        self.board = Board(settings.columns, settings.rows)
         self.colliding_squares = []
         # Create a sprite group for the ships
         self.unplaced_ships = pygame.sprite.LayeredUpdates()
         # Is normal sprite group enough?
         self.placed_ships = pygame.sprite.LayeredUpdates() 
         self.square_size = self.grid.get_square_size_abs()
-        # Normal sprite groups are not ordered, so this might return something else than the top left square
-        self.start_square = self.grid.get_square((0,0))
+        self.start_square = self.square_group.square_at((0, 0))
         # Add every ship to the ships group
         grid_rect = self.grid.get_rect()
         for i in range(0, settings.carrier_count):
@@ -359,14 +508,14 @@ class Placement(Scene):
         moved = False
         # Check events
         if self.disconnect_menu.visible:
-            selection = self.disconnect_menu.check_menu_events()
+            selection = self.disconnect_menu.check_menu_events(self.scene_handler.events.get())
             if selection == self.disconnect_menu.no_btn or selection == -1:
                 self.disconnect_menu.visible = False
             elif selection == self.disconnect_menu.yes_btn:
                 self.connection.close()
                 self.scene_handler.switch(Scene.MAIN_MENU, self.screen)
         else:
-            for event in pygame.event.get():
+            for event in self.scene_handler.events.get():
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         self.disconnect_menu.visible = True
@@ -378,6 +527,10 @@ class Placement(Scene):
                     elif event.key == pygame.K_r:
                         self.awaiting_ship.rotate(self.grid.get_rect())
                         moved = True
+                    elif event.key == pygame.K_a:
+                        self.auto_place()
+                        # The rest of the events are still handled
+                        continue
                     elif event.key == pygame.K_UP:
                         self.awaiting_ship.move_up()
                         moved = True
@@ -397,18 +550,13 @@ class Placement(Scene):
                         self.try_place()
                     
     def check_collision(self):
-        self.colliding_squares = []
-        collides = False
         # Find the ship's position and check if it's reserved
-        for square in self.awaiting_ship.get_squares():
-            current_colliding_squares = pygame.sprite.spritecollide(square, self.reserved_squares, False)
-            if len(current_colliding_squares) > 0:
-                self.colliding_squares.append(square)
-                collides = True
-        if collides:
-            return True
-        else:
+        squares = self.awaiting_ship.get_squares()
+        if not self.board.collides(self.board.positions_mask(square.pos for square in squares)):
+            self.colliding_squares = []
             return False
+        self.colliding_squares = [square for square in squares if self.board.occupied(*square.pos)]
+        return True
     
     def do_logic(self):
         # Check if the connection was closed
@@ -421,7 +569,7 @@ class Placement(Scene):
             self.scene_handler.switch(Scene.CONNECTION_CLOSED, self.screen, msg)
 
         if self.ready_msg_sent == False and self.ready:
-            packet = Packet([1], Packet.T_READY)
+            packet = Packet([], Packet.T_READY)
             self.connection.send_queue.put(packet)
             self.ready_msg_sent = True
 
@@ -431,35 +579,64 @@ class Placement(Scene):
                 self.ready_msg_received = True
 
         if self.ready_msg_sent and self.ready_msg_received:
-            self.scene_handler.switch(Scene.CLASH, self.screen, settings, self.connection, self.placed_ships)
+            self.scene_handler.switch(Scene.CLASH, self.screen, settings, self.connection, self.placed_ships, self.board)
            
-    def draw(self):
+    def track_changes(self):
+        if self.ready:
+            self.track("ship", None)
+        else:
+            self.track("ship", self.awaiting_ship.rect, (len(self.placed_ships), self.awaiting_ship.rotated))
+
+    def draw_layers(self):
         # Draw (order is important)
         self.screen.fill(color.GREY)
         self.grid.draw(self.screen)
-#            square_group.draw(screen)
         self.placed_ships.draw(self.screen)
         if not self.ready:
             self.awaiting_ship.draw(self.screen)
             pygame.draw.rect(self.screen, color.GREEN, self.awaiting_ship.rect, 2)
         # Draw a transparent surface on top of the colliding squares
+        # The squares have the same size, so they share one surface
         for s in self.colliding_squares:
-            transparent_surf = pygame.Surface((s.rect.width, s.rect.height))
-            transparent_surf.set_alpha(128)
-            transparent_surf.fill(color.RED)
-            self.screen.blit(transparent_surf, (s.rect.x, s.rect.y)) 
+            transparent_surf = assets.get_fill(s.rect.size, color.RED, 128)
+            self.screen.blit(transparent_surf, (s.rect.x, s.rect.y))
         if self.disconnect_menu.visible:
             self.disconnect_menu.draw_components()
         # Status
         #screen.blit(status.surf, status.rect)
 
+    def auto_place(self):
+        """
+        Place every ship that has not been placed yet on a random free position.
+
+        :return: True if the ships were placed, False if they do not fit on the free squares
+        :rtype: bool
+        """
+        ships = self.unplaced_ships.sprites()
+        layout = random_layout(self.board.columns, self.board.rows, [s.size for s in ships], occupied=self.board.ships)
+        if layout == None:
+            return False
+        for (s, mask) in zip(ships, layout):
+            # The first position of a mask is the top left square of the ship
+            positions = self.board.positions(mask)
+            (x, y) = positions[0]
+            s.set_rotated(len(positions) > 1 and positions[1][1] != y)
+            square = self.square_group.square_at((x, y))
+            s.move_to(square.rect.x, square.rect.y)
+            self.awaiting_ship = s
+            self.collides = self.check_collision()
+            self.try_place()
+        # The ships were placed all over the grid
+        self.invalidate()
+        return True
+
     def try_place(self):
         # If the position is not reserved, the ship is placed there
         if self.collides == False:
             # Add the ship to the group of placed ships
             self.placed_ships.add(self.awaiting_ship)
             # Reserve the squares
-            self.reserved_squares.add(self.awaiting_ship.get_squares())
+            self.board.place(self.board.positions_mask(square.pos for square in self.awaiting_ship.get_squares()))
             # Remove the ship from awaiting ships
             self.unplaced_ships.remove(self.awaiting_ship)
             if len(self.unplaced_ships) > 0:
@@ -491,6 +668,8 @@ class DisconnectMenu(Scene, menu.Menu):
         menu.Menu.__init__(self, screen, [self.title], [self.no_btn, self.yes_btn], pop_rect, color.BLUE_GREY)
 
 class ConnectionClosedMenu(Scene, menu.Menu):
+    frame_rate = 30
+
     def __init__(self, scene_handler, screen, message):
         self.scene_handler = scene_handler
         self.screen = screen
@@ -508,7 +687,7 @@ class ConnectionClosedMenu(Scene, menu.Menu):
         menu.Menu.__init__(self, screen, [self.title], [self.ok_btn], pop_rect, color.BLUE_GREY)
 
     def check_events(self):
-        selection = self.check_menu_events()
+        selection = self.check_menu_events(self.scene_handler.events.get())
         if selection == -1 or selection == self.ok_btn:
             self.scene_handler.switch(Scene.MAIN_MENU, self.screen)
 
@@ -518,10 +697,11 @@ class ConnectionClosedMenu(Scene, menu.Menu):
     def draw(self):
         self.draw_components()
 
-class Clash(Scene):
-    def __init__(self, scene_handler, screen, settings, connection, placed_ships):
+class Clash(IncrementalScene):
+    def __init__(self, scene_handler, screen, settings, connection, placed_ships, board):
         self.scene_handler = scene_handler
         self.screen = screen
+        self.init_rendering()
         self.settings = settings
         self.connection = connection
         self.disconnect_menu = DisconnectMenu(screen)
@@ -537,10 +717,11 @@ class Clash(Scene):
         self.square_size = self.my_grid.get_square_size_abs()
         self.my_squares = self.my_grid.get_square_group(color.GREEN)
         self.enemy_squares = self.enemy_grid.get_square_group(color.GREEN)
-        start_square = self.enemy_squares.sprites()[0]
+        # The rules are checked on our board and our strikes are kept in the ledger, the sprite groups are only drawn
+        self.my_board = board
+        self.strike_ledger = StrikeLedger(settings.columns, settings.rows)
         # Create spritegroups for the ships and strikes
         self.my_ships = placed_ships
-        self.my_strikes = pygame.sprite.Group()
         self.my_hits = pygame.sprite.Group()
         self.my_misses = pygame.sprite.Group()
         self.enemy_strikes = pygame.sprite.Group()
@@ -554,13 +735,12 @@ class Clash(Scene):
         # Decide who goes first
         self.your_turn = False
         going_first = 0
-        is_host = isinstance(self.connection, networking.server.Server)
-        if is_host:
+        if self.connection.is_host:
             going_first = random.randint(0, 1)
             if going_first == 0:
                 self.your_turn = True
             else:
-                go_first_packet = Packet([1], Packet.T_YOUR_TURN)
+                go_first_packet = Packet([], Packet.T_YOUR_TURN)
                 self.connection.send_queue.put(go_first_packet)
 
         # Create status labels
@@ -573,14 +753,14 @@ class Clash(Scene):
 
     def check_events(self):
         if self.disconnect_menu.visible:
-            selection = self.disconnect_menu.check_menu_events()
+            selection = self.disconnect_menu.check_menu_events(self.scene_handler.events.get())
             if selection == self.disconnect_menu.no_btn or selection == -1:
                 self.disconnect_menu.visible = False
             elif selection == self.disconnect_menu.yes_btn:
                 self.connection.close()
                 self.scene_handler.switch(Scene.MAIN_MENU, self.screen)
         else:
-            for event in pygame.event.get():
+            for event in self.scene_handler.events.get():
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         self.disconnect_menu.visible = True
@@ -593,10 +773,11 @@ class Clash(Scene):
                             self.crosshair.move_right()
                         elif event.key == pygame.K_LEFT:
                             self.crosshair.move_left()
+                        elif event.key == pygame.K_TAB:
+                            self.skip_to_unstruck()
                         elif event.key == pygame.K_RETURN:
                             if self.try_strike():
-                                target_square = self.crosshair.get_squares().sprites()[0]
-                                self.my_strikes.add(target_square)
+                                target_square = self.crosshair.get_squares()[0]
                                 strike_pos = target_square.pos
                                 # Send the strike coordinates to opponent
                                 strike_packet = Packet(strike_pos, Packet.T_STRIKE)
@@ -610,23 +791,21 @@ class Clash(Scene):
         :return: True if the strike was done, False if the position had already been struck
         :rtype: bool
         """
-        target_square = self.crosshair.get_squares().sprites()[0]
-        already_struck = False
-        for square in self.my_strikes:
-            if square == target_square:
-                already_struck = True
-                break
-
-        if already_struck:
-            return False
-        else:
-            return True
+        target_square = self.crosshair.get_squares()[0]
+        return self.strike_ledger.add(*target_square.pos)
+
+    def skip_to_unstruck(self):
+        """
+        Move the crosshair to the next square that has not been struck.
+        """
+        pos = self.crosshair.get_squares()[0].pos
+        next_pos = self.strike_ledger.next_unstruck(*pos)
+        if next_pos != None:
+            square = self.enemy_squares.square_at(next_pos)
+            self.crosshair.move_to(square.rect.x, square.rect.y)
 
     def get_square_in_coordinates(self, square_group, position):
-        position = tuple(position)
-        for square in square_group:
-            if square.pos == position:
-                return square
+        return square_group.square_at(tuple(position))
 
     def evaluate_enemy_strike(self, strike_pos):
         """
@@ -636,23 +815,19 @@ class Clash(Scene):
         :return: 1 if the strike hit our ship, 0 if the strike missed
         :rtype: int
         """
-        hit = False
         target_square = self.get_square_in_coordinates(self.my_squares, strike_pos)
-        for ship in self.my_ships:
-            for square in ship.get_squares():
-                if square.pos == strike_pos:
-                    hit = True
-            
-        if hit:
+        if self.my_board.strike(strike_pos[0], strike_pos[1]):
             hitmarker = Hitmarker(self.square_size, self.my_grid.get_rect(), self.my_squares)
             hitmarker.move_to(target_square.rect.x, target_square.rect.y)
             self.enemy_hits.add(hitmarker)
+            self.invalidate(hitmarker.rect)
             self.left_status.text = "A hit!"
             return 1
         else:
             missmarker = Missmarker(self.square_size, self.my_grid.get_rect(), self.my_squares)
             missmarker.move_to(target_square.rect.x, target_square.rect.y)
             self.enemy_misses.add(missmarker)
+            self.invalidate(missmarker.rect)
             self.left_status.text = "A miss!"
             return 0
 
@@ -670,11 +845,13 @@ class Clash(Scene):
             hitmarker = Hitmarker(self.square_size, self.enemy_grid.get_rect(), self.enemy_squares)
             hitmarker.move_to(target_square.rect.x, target_square.rect.y)
             self.my_hits.add(hitmarker)
+            self.invalidate(hitmarker.rect)
             self.right_status.text = "A hit!"
         else:
             missmarker = Missmarker(self.square_size, self.enemy_grid.get_rect(), self.enemy_squares)
             missmarker.move_to(target_square.rect.x, target_square.rect.y)
             self.my_misses.add(missmarker)
+            self.invalidate(missmarker.rect)
             self.right_status.text = "A miss!"
 
     def do_logic(self):
@@ -700,13 +877,14 @@ class Clash(Scene):
             enemy_result_packet = Packet(data, Packet.T_STRIKE_RESULT)
             self.connection.send_queue.put(enemy_result_packet)
             # Check if our fleet has been destroyed
-            if len(self.enemy_hits) == self.settings.total_reserved_squares:
+            if self.my_board.fleet_destroyed():
                 # Send game over message
-                game_over = Packet([1], Packet.T_GAME_OVER)
+                game_over = Packet([], Packet.T_GAME_OVER)
                 self.connection.send_queue.put(game_over)
                 # Hide the disconnect menu if it's open
                 self.disconnect_menu.visible = False
-                self.draw()
+                if not self.scene_handler.headless:
+                    self.draw()
                 self.scene_handler.switch(Scene.END, self.screen, self.settings, self.connection)
             else:
                 self.your_turn = True
@@ -719,11 +897,18 @@ class Clash(Scene):
 
         game_over_packet = self.connection.get_packet(Packet.T_GAME_OVER)
         if game_over_packet != None:
-            self.draw()
+            if not self.scene_handler.headless:
+                self.draw()
             print("Victory!")
             self.scene_handler.switch(Scene.END, self.screen, self.settings, self.connection)
 
-    def draw(self):
+    def track_changes(self):
+        self.track("crosshair", self.crosshair.rect if self.your_turn else None)
+        # A new text of the same size would not change the rectangle
+        self.track("left_status", self.left_status.rect, self.left_status.text)
+        self.track("right_status", self.right_status.rect, self.right_status.text)
+
+    def draw_layers(self):
         self.screen.fill(color.GREY)
         self.my_grid.draw(self.screen)
         self.enemy_grid.draw(self.screen)
@@ -767,7 +952,7 @@ class End(Scene):
         self.menu = self.EndMenu(screen)
 
     def check_events(self):
-        selection = self.menu.check_menu_events()
+        selection = self.menu.check_menu_events(self.scene_handler.events.get())
         if selection == -1:
             exit()
 
@@ -27,3 +27,16 @@ class Settings:
                 + self.cruiser_count * self.cruiser_size \
                 + self.submarine_count * self.submarine_size \
                 + self.patrol_boat_count * self.patrol_boat_size
+
+    def ship_sizes(self):
+        """
+        Get the size of every ship in the fleet, in the order the ships are placed.
+
+        :return: the sizes, one for each ship
+        :rtype: list
+        """
+        return [self.carrier_size] * self.carrier_count \
+                + [self.battleship_size] * self.battleship_count \
+                + [self.cruiser_size] * self.cruiser_count \
+                + [self.submarine_size] * self.submarine_count \
+                + [self.patrol_boat_size] * self.patrol_boat_count
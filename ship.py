@@ -1,4 +1,4 @@
-from pygame import transform
+import assets
 from gridcomponent import GridComponent
 
 class Ship(GridComponent):
@@ -19,7 +19,7 @@ class Ship(GridComponent):
         :param int size: how many squares the ship takes on the grid
         :param tuple square_size: the size (width, height) of a square on the grid
         :param pygame.Rect grid_rect: the rectangle of the grid's boundaries
-        :param pygame.sprite.Group() square_group: the squares of the grid
+        :param grid.SquareGroup square_group: the squares of the grid
         :param str image_name: the filename of the image with the file extension included
         """
         self.size = size
@@ -74,6 +74,25 @@ class Ship(GridComponent):
         else:
             return False
 
+    def set_rotated(self, rotated):
+        """
+        Turn the ship to an orientation without checking the boundaries.
+        The top left corner of the ship stays in place.
+
+        :param bool rotated: should the ship be rotated
+        """
+        if rotated == self.rotated:
+            return
+        self.rotated = rotated
+        if rotated:
+            self.image = self._rotated_surf
+        else:
+            self.image = self._default_surf
+        current_x = self.rect.x
+        current_y = self.rect.y
+        self.rect = self.image.get_rect()
+        self.move_to(current_x, current_y)
+
     def scale_image(self, size):
         """
         Scale the image according to the size parameter.
@@ -89,13 +108,12 @@ class Ship(GridComponent):
         # Scale
         width = size[0]
         height = size[1]
-        self._default_surf = transform.smoothscale(self._default_surf, (width * self.size, height))
-        self._rotated_surf = transform.smoothscale(self._rotated_surf, (width, height * self.size))
-        rotated = self._angles[1]
+        self._default_surf = assets.get_image(self.image_name, (width * self.size, height), self._angles[0])
+        self._rotated_surf = assets.get_image(self.image_name, (width, height * self.size), self._angles[1])
         if self.rotated:
-            self.image = self._rotated_surf.copy()
+            self.image = self._rotated_surf
         else:
-            self.image = self._default_surf.copy()
+            self.image = self._default_surf
 
         # Update the rectangle
         current_x = self.rect.x
@@ -117,8 +135,8 @@ class Ship(GridComponent):
         """
         self.image = GridComponent.load_image(self, image_name)
         # Set the default surface
-        self._default_surf = self.image.copy()
+        self._default_surf = self.image
         # Set the rotated surface
-        self._rotated_surf = transform.rotate(self.image.copy(), self._angles[1])
+        self._rotated_surf = assets.get_image(image_name, None, self._angles[1])
 
         return self.image
@@ -0,0 +1,16 @@
+import os
+import sys
+# The dummy drivers must be chosen before pygame opens the display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# The game is run from its directory, which has the modules and the data directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+import pygame
+import pytest
+
+@pytest.fixture(scope="session")
+def screen():
+    pygame.init()
+    return pygame.display.set_mode((1000, 700))
@@ -0,0 +1,71 @@
+import random
+import time
+import pytest
+np = pytest.importorskip("numpy")
+import settings
+from ai import AIOpponent, DensityTargeting, RandomTargeting
+from networking.loopback import loopback_pair
+
+def brute_force_density(targeting, columns, rows, ship_sizes):
+    """
+    Count the weighted placements covering each square one placement at a time.
+    """
+    expected = np.zeros((rows, columns), dtype=np.int64)
+    for size in ship_sizes:
+        for y in range(rows):
+            for x in range(columns):
+                for (dx, dy) in ((1, 0), (0, 1)):
+                    cells = [(x + dx * i, y + dy * i) for i in range(size)]
+                    if any(cx >= columns or cy >= rows or targeting.misses[cy, cx] for (cx, cy) in cells):
+                        continue
+                    weight = 1 + DensityTargeting.HIT_WEIGHT * sum(int(targeting.hits[cy, cx]) for (cx, cy) in cells)
+                    for (cx, cy) in cells:
+                        expected[cy, cx] += weight
+    expected[targeting.struck()] = 0
+    return expected
+
+@pytest.mark.parametrize("trial", range(20))
+def test_density_matches_brute_force(trial):
+    rng = random.Random(trial)
+    (columns, rows) = (rng.randint(3, 8), rng.randint(3, 8))
+    ship_sizes = [rng.randint(1, 4) for _ in range(rng.randint(1, 4))]
+    targeting = DensityTargeting(columns, rows, ship_sizes, trial)
+    for _ in range(rng.randint(0, 10)):
+        targeting.record(rng.randrange(columns), rng.randrange(rows), rng.random() < 0.4)
+    assert (targeting.density() == brute_force_density(targeting, columns, rows, ship_sizes)).all()
+
+@pytest.mark.parametrize("targeting_class", [RandomTargeting, DensityTargeting])
+def test_targeting_strikes_every_square_once(targeting_class):
+    targeting = targeting_class(4, 3, [2, 3], 0)
+    targets = []
+    while True:
+        target = targeting.next_target()
+        if target == None:
+            break
+        targeting.record(target[0], target[1], False)
+        targets.append(target)
+    assert sorted(targets) == [(x, y) for x in range(4) for y in range(3)]
+
+@pytest.mark.parametrize("seed", range(3))
+def test_computer_against_computer_over_loopback(seed):
+    game_settings = settings.Settings()
+    (host, guest) = loopback_pair()
+    opponents = [AIOpponent(host, game_settings, host=True, seed=seed),
+                 AIOpponent(guest, game_settings, seed=seed + 100)]
+    threads = [opponent.start() for opponent in opponents]
+    try:
+        deadline = time.monotonic() + 30
+        while any(opponent.won == None for opponent in opponents):
+            assert time.monotonic() < deadline, "the game did not finish in time"
+            time.sleep(0.01)
+        (winner, loser) = opponents if opponents[0].won else opponents[::-1]
+        assert winner.won and not loser.won
+        assert loser.board.fleet_destroyed()
+        assert not winner.board.fleet_destroyed()
+    finally:
+        host.close()
+        for opponent in opponents:
+            opponent.stop()
+        for thread in threads:
+            thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
@@ -0,0 +1,29 @@
+import random
+from board import Board, placement_masks, random_layout
+
+def test_random_layout_never_overlaps():
+    rng = random.Random(1)
+    for seed in range(2000):
+        (columns, rows) = (rng.randint(2, 10), rng.randint(2, 10))
+        ship_sizes = [rng.randint(1, 5) for _ in range(rng.randint(1, 6))]
+        layout = random_layout(columns, rows, ship_sizes, random.Random(seed))
+        if layout == None:
+            continue
+        taken = 0
+        for (size, mask) in zip(ship_sizes, layout):
+            assert mask in placement_masks(columns, rows, size)
+            assert taken & mask == 0
+            taken |= mask
+
+def test_random_layout_avoids_occupied_squares():
+    board = Board(10, 10)
+    board.place(board.ship_mask(0, 0, 5))
+    layout = random_layout(10, 10, [5, 4, 3, 3, 2], random.Random(2), board.ships)
+    for mask in layout:
+        assert not board.collides(mask)
+
+def test_random_layout_reports_a_fleet_that_does_not_fit():
+    assert random_layout(3, 3, [3, 3, 3, 3], random.Random(3)) == None
+
+def test_random_layout_is_deterministic_for_a_seed():
+    assert random_layout(10, 10, [5, 4, 3, 3, 2], random.Random(4)) == random_layout(10, 10, [5, 4, 3, 3, 2], random.Random(4))
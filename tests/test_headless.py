@@ -0,0 +1,65 @@
+import time
+import pytest
+import scene
+import settings
+from headless import ScriptedPlayer, play
+from networking.loopback import loopback_pair
+
+def play_to_end(players, timeout=60.0):
+    """
+    Tick the players until every one of them has finished.
+
+    :return: the last Clash scene of each player
+    :rtype: list
+    """
+    clashes = [None] * len(players)
+    deadline = time.monotonic() + timeout
+    while not all(player.finished() for player in players):
+        assert time.monotonic() < deadline, "the game did not finish in time"
+        for (i, player) in enumerate(players):
+            if not player.finished():
+                player.tick()
+            if isinstance(player.scene_handler.scene, scene.Clash):
+                clashes[i] = player.scene_handler.scene
+    return clashes
+
+@pytest.mark.parametrize("auto_place", [False, True])
+def test_scripted_players_play_a_full_game(screen, auto_place):
+    game_settings = settings.Settings()
+    (host, guest) = loopback_pair()
+    players = [ScriptedPlayer(screen, game_settings, host, 1, auto_place),
+               ScriptedPlayer(screen, game_settings, guest, 2, auto_place)]
+    clashes = play_to_end(players)
+    for player in players:
+        assert isinstance(player.scene_handler.scene, scene.End)
+    # Exactly one fleet was destroyed
+    destroyed = [clash.my_board.fleet_destroyed() for clash in clashes]
+    assert sorted(destroyed) == [False, True]
+    for clash in clashes:
+        assert len(clash.my_ships) == len(game_settings.ship_sizes())
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_play_over_sockets(screen, use_async):
+    assert play(screen, settings.Settings(), use_async, seed=3) != None
+
+def test_scripted_player_against_the_computer(screen):
+    ai = pytest.importorskip("ai")
+    game_settings = settings.Settings()
+    (host, guest) = loopback_pair()
+    player = ScriptedPlayer(screen, game_settings, host, 4, auto_place=True)
+    opponent = ai.AIOpponent(guest, game_settings, seed=5)
+    thread = opponent.start()
+    try:
+        [clash] = play_to_end([player])
+        assert isinstance(player.scene_handler.scene, scene.End)
+        deadline = time.monotonic() + 10
+        while opponent.won == None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The computer won exactly when our fleet was destroyed
+        assert opponent.won == clash.my_board.fleet_destroyed()
+        assert opponent.board.fleet_destroyed() == (not opponent.won)
+    finally:
+        host.close()
+        opponent.stop()
+        thread.join(5)
+    assert not thread.is_alive()
@@ -0,0 +1,49 @@
+from networking.loopback import loopback_pair, DirectQueue
+from networking.packet import Packet
+
+def test_packets_are_delivered_in_order():
+    (host, guest) = loopback_pair()
+    assert host.is_host and not guest.is_host
+    assert host.connected and guest.connected
+    assert host.version == guest.version == Packet.VERSION
+    host.send_queue.put(Packet([3, 4], Packet.T_STRIKE))
+    host.send_queue.put(Packet([1, 3, 4], Packet.T_STRIKE_RESULT))
+    host.send_queue.put(Packet([5, 6], Packet.T_STRIKE))
+    assert guest.get_packet(Packet.T_STRIKE).get_data(include_header=False) == [3, 4]
+    assert guest.get_packet().type == Packet.T_STRIKE_RESULT
+    assert guest.wait_packet(Packet.T_STRIKE, timeout=0).get_data(include_header=False) == [5, 6]
+    assert guest.get_packet() == None
+    # Nothing comes back to the sender
+    assert host.get_packet() == None
+    assert host.stats.packets_out == {Packet.T_STRIKE: 2, Packet.T_STRIKE_RESULT: 1}
+    assert guest.stats.packets_in == host.stats.packets_out
+
+def test_direct_queue_never_holds_packets():
+    (host, guest) = loopback_pair()
+    queue = host.send_queue
+    assert isinstance(queue, DirectQueue)
+    # None only wakes up a sender and is dropped
+    queue.put(None)
+    queue.put_nowait(Packet([], Packet.T_READY))
+    assert queue.qsize() == 0 and queue.empty()
+    assert guest.get_packet().type == Packet.T_READY
+    assert guest.get_packet() == None
+
+def test_closure_is_seen_once_by_both_ends():
+    (host, guest) = loopback_pair()
+    woken = []
+    host.wakeup = lambda: woken.append("host")
+    guest.wakeup = lambda: woken.append("guest")
+    guest.close()
+    assert "host" in woken and "guest" in woken
+    assert not host.connected and not guest.connected
+    assert host.check_closure() == True
+    assert guest.check_closure() == True
+    # Closing again or from the other end does not report a second closure
+    guest.close()
+    host.close()
+    assert host.check_closure() == None
+    assert guest.check_closure() == None
+    # A closed end does not send anything
+    guest.send_queue.put(Packet([], Packet.T_READY))
+    assert host.get_packet() == None
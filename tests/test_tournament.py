@@ -0,0 +1,17 @@
+import pytest
+pytest.importorskip("numpy")
+import tournament
+
+def without_timings(report):
+    return {key: value for (key, value) in report.items() if key not in ("seconds", "games_per_sec", "games_per_cpu_sec", "workers")}
+
+def test_results_do_not_depend_on_the_workers():
+    single = tournament.run(("density", "random"), 24, seed=5, workers=1, batch=7)
+    parallel = tournament.run(("density", "random"), 24, seed=5, workers=2, batch=4)
+    assert without_timings(single) == without_timings(parallel)
+    assert sum(bot["wins"] for bot in single["bots"].values()) == 24
+
+def test_wilson_interval_contains_the_rate():
+    (low, high) = tournament.wilson_interval(30, 100)
+    assert low < 0.3 < high
+    assert tournament.wilson_interval(0, 0) == (0.0, 1.0)
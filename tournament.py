@@ -0,0 +1,238 @@
+"""
+Plays games between targeting bots without sprites or connections to compare and tune them.
+
+The games follow the rules of the Clash scene on board.Board: a strike hits if it lands on a ship,
+and the game is over when every square of a fleet has been struck. The fleets are placed with
+board.random_layout() and the player going first is chosen at random, like the host does.
+Games are split into batches that run in parallel on every CPU. Each game is seeded from the
+seed of the run and the number of the game, so a run gives the same results with any number of workers.
+
+Run with: python tournament.py density random --games 10000 --seed 1 --output results.json
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+import random
+from concurrent.futures import ProcessPoolExecutor
+from board import Board, random_layout
+from ai import RandomTargeting, DensityTargeting
+import settings
+
+# The targetings that can take part, by name
+BOTS = {
+    "random": RandomTargeting,
+    "density": DensityTargeting,
+}
+
+def play_game(columns, rows, ship_sizes, bots, seed):
+    """
+    Play one game between two bots.
+
+    :param int columns: how many squares there are horizontally
+    :param int rows: how many squares there are vertically
+    :param list ship_sizes: the size of every ship in the fleet
+    :param tuple bots: the names of the two bots
+    :param seed: seed for the fleets, the strikes and the player going first
+    :return: the index of the winner in bots, how many strikes the winner made and the index of the player who went first
+    :rtype: tuple
+    """
+    rng = random.Random(seed)
+    boards = []
+    targetings = []
+    for name in bots:
+        board = Board(columns, rows)
+        layout = random_layout(columns, rows, ship_sizes, rng)
+        if layout == None:
+            raise ValueError("The fleet does not fit on the board")
+        for mask in layout:
+            board.place(mask)
+        boards.append(board)
+        targetings.append(BOTS[name](columns, rows, ship_sizes, rng.random()))
+    first = rng.randint(0, 1)
+    turn = first
+    shots = [0, 0]
+    while True:
+        target = targetings[turn].next_target()
+        if target == None:
+            raise RuntimeError(f"{bots[turn]} ran out of targets")
+        opponent = boards[1 - turn]
+        # The same rules as Clash.evaluate_enemy_strike() and check_strike_result()
+        hit = opponent.strike(*target)
+        targetings[turn].record(target[0], target[1], hit)
+        shots[turn] += 1
+        if opponent.fleet_destroyed():
+            return (turn, shots[turn], first)
+        turn = 1 - turn
+
+def game_seed(seed, number):
+    """
+    Get the seed of a game of a run.
+
+    :param int seed: the seed of the run
+    :param int number: the number of the game in the run
+    :rtype: str
+    """
+    return f"{seed}:{number}"
+
+def play_batch(columns, rows, ship_sizes, bots, seed, start, count):
+    """
+    Play games start..start + count - 1 of a run. Run in the worker processes.
+
+    :return: the results of the games like play_game() returns them and the CPU time used in seconds
+    :rtype: tuple
+    """
+    cpu = time.process_time()
+    results = []
+    for number in range(start, start + count):
+        # Every other game the bots switch places so neither is always the first one asked to move
+        order = bots if number % 2 == 0 else bots[::-1]
+        (winner, shots, first) = play_game(columns, rows, ship_sizes, order, game_seed(seed, number))
+        if number % 2 == 1:
+            winner = 1 - winner
+            first = 1 - first
+        results.append((winner, shots, first))
+    return (results, time.process_time() - cpu)
+
+def wilson_interval(wins, games, z=1.96):
+    """
+    Get the Wilson score interval of a win rate.
+
+    :param int wins: how many games were won
+    :param int games: how many games were played
+    :param float z: the standard score of the confidence level, 1.96 for 95%
+    :return: the lower and the upper bound
+    :rtype: tuple
+    """
+    if games == 0:
+        return (0.0, 1.0)
+    rate = wins / games
+    denominator = 1 + z * z / games
+    center = (rate + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+def _percentile(sorted_values, fraction):
+    if len(sorted_values) == 0:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def _format(value, spec):
+    """
+    Format a number of the report, "n/a" for the values that are None when no games were played.
+    """
+    if value == None:
+        return "n/a"
+    return format(value, spec)
+
+def summarize(bots, results, elapsed, cpu, workers):
+    """
+    Collect the results of a run into a report.
+
+    :param tuple bots: the names of the two bots
+    :param list results: the results of the games like play_game() returns them
+    :param float elapsed: the wall-clock time of the run in seconds
+    :param float cpu: the CPU time used by the workers in seconds
+    :param int workers: how many worker processes played the games
+    :return: the report
+    :rtype: dict
+    """
+    games = len(results)
+    report = {
+        "games": games,
+        "workers": workers,
+        "seconds": elapsed,
+        "games_per_sec": games / elapsed if elapsed > 0 else None,
+        "games_per_cpu_sec": games / cpu if cpu > 0 else None,
+        "bots": {},
+    }
+    for (index, name) in enumerate(bots):
+        shots = sorted(shots for (winner, shots, _) in results if winner == index)
+        wins = len(shots)
+        (low, high) = wilson_interval(wins, games)
+        distribution = {}
+        for value in shots:
+            distribution[value] = distribution.get(value, 0) + 1
+        report["bots"][f"{index}:{name}"] = {
+            "wins": wins,
+            "win_rate": wins / games if games > 0 else None,
+            "win_rate_95ci": [low, high],
+            "wins_going_first": sum(1 for (winner, _, first) in results if winner == index and first == index),
+            "shots_to_win": {
+                "mean": sum(shots) / wins if wins > 0 else None,
+                "p10": _percentile(shots, 0.1),
+                "median": _percentile(shots, 0.5),
+                "p90": _percentile(shots, 0.9),
+                "distribution": distribution,
+            },
+        }
+    return report
+
+def run(bots, games, seed=0, workers=None, columns=None, rows=None, batch=None):
+    """
+    Play a run of games between two bots on every CPU.
+
+    :param tuple bots: the names of the two bots in BOTS
+    :param int games: how many games to play
+    :param int seed: the seed of the run
+    :param int workers: how many worker processes to use, the number of CPUs if not provided
+    :param int columns: the width of the grid, the width in settings.Settings if not provided
+    :param int rows: the height of the grid, the height in settings.Settings if not provided
+    :param int batch: how many games a worker plays at a time, chosen from the number of games if not provided
+    :return: the report, see summarize()
+    :rtype: dict
+    """
+    for name in bots:
+        if name not in BOTS:
+            raise ValueError(f"Unknown bot: {name}")
+    game_settings = settings.Settings()
+    columns = columns or game_settings.columns
+    rows = rows or game_settings.rows
+    ship_sizes = game_settings.ship_sizes()
+    workers = workers or os.cpu_count() or 1
+    if batch == None:
+        # Enough batches to keep every worker busy until the end, few enough to keep the overhead small
+        batch = max(1, min(1000, games // (workers * 8)))
+    results = []
+    cpu = 0.0
+    wall = time.perf_counter()
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(play_batch, columns, rows, ship_sizes, tuple(bots), seed, start, min(batch, games - start))
+                   for start in range(0, games, batch)]
+        for future in futures:
+            (batch_results, batch_cpu) = future.result()
+            results.extend(batch_results)
+            cpu += batch_cpu
+    elapsed = time.perf_counter() - wall
+    report = summarize(bots, results, elapsed, cpu, workers)
+    report.update({"seed": seed, "columns": columns, "rows": rows, "ship_sizes": ship_sizes})
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Play games between warships bots")
+    parser.add_argument("bots", nargs=2, choices=sorted(BOTS), help="the two bots")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, the number of CPUs by default")
+    parser.add_argument("--columns", type=int, default=None)
+    parser.add_argument("--rows", type=int, default=None)
+    parser.add_argument("--output", help="file to write the JSON report to")
+    args = parser.parse_args()
+    # Keep the output of imported modules out of the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args.bots, args.games, args.seed, args.workers, args.columns, args.rows)
+    print(f"{report['games']} games in {report['seconds']:.2f} s with {report['workers']} workers: "
+          f"{_format(report['games_per_sec'], '.1f')} games/s, {_format(report['games_per_cpu_sec'], '.1f')} games/s per core")
+    for (name, result) in report["bots"].items():
+        (low, high) = result["win_rate_95ci"]
+        print(f"{name}: won {result['wins']} ({_format(result['win_rate'], '.1%')}, 95% CI {low:.1%}-{high:.1%}), "
+              f"shots to win mean {_format(result['shots_to_win']['mean'], '.2f')}, median {_format(result['shots_to_win']['median'], 'd')}")
+    if args.output != None:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(report, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()